@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+Compare the hand-written ISO 8601 parser against the strptime path.
+
+    python benchmarks/iso.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import datetime
+
+from moment.parse import parse_iso
+
+
+CASES = [
+    ('date', '2012-12-18', '%Y-%m-%d'),
+    ('datetime', '2012-12-18T10:30:05', '%Y-%m-%dT%H:%M:%S'),
+    ('fraction', '2012-12-18T10:30:05.123456', '%Y-%m-%dT%H:%M:%S.%f'),
+]
+
+NUMBER = 100000
+
+
+def main():
+    for name, string, formula in CASES:
+        iso = min(timeit.repeat(lambda: parse_iso(string), number=NUMBER, repeat=3))
+        strptime = min(timeit.repeat(lambda: datetime.strptime(string, formula),
+                                     number=NUMBER, repeat=3))
+        print('%-10s parse_iso %6.2f us   strptime %6.2f us   %.1fx' % (
+            name, iso / NUMBER * 1e6, strptime / NUMBER * 1e6, strptime / iso))
+
+
+if __name__ == '__main__':
+    main()
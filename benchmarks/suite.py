@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+"""
+Benchmarks for moment's hot paths: parsing, formatting, arithmetic,
+truncation, time zones and epochs. Everything runs offline against
+fixtures generated from a fixed seed, so results are comparable between
+commits on the same machine.
+
+    python benchmarks/suite.py --output before.json
+    # ... make changes ...
+    python benchmarks/suite.py --compare before.json
+
+Times are reported in microseconds per item (lower is better).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from multiprocessing.pool import ThreadPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from datetime import datetime, timedelta
+
+import moment
+from moment import parallel
+from moment.parse import (clear_format_cache, disable_parse_cache, enable_parse_cache,
+                          parse_date_and_formula, parse_js_date)
+
+
+SEED = 1355788800
+SIZE = 1000
+WORKERS = 4
+LOG_FORMAT = 'YYYY-MM-DD HH:mm:ss'
+CSV_FORMAT = 'MM/DD/YYYY h:mm:ss A'
+
+BENCHMARKS = []
+
+
+def benchmark(name):
+    """
+    Register a function that builds a zero-argument callable to time, or a
+    (callable, cleanup) pair when it holds resources such as a pool.
+    """
+    def register(function):
+        BENCHMARKS.append((name, function))
+        return function
+    return register
+
+
+class Fixtures(object):
+    """Deterministic inputs shared by every benchmark."""
+
+    def __init__(self, size=SIZE, seed=SEED):
+        generator = random.Random(seed)
+        start = datetime(2012, 1, 1)
+        self.dates = [
+            start + timedelta(seconds=generator.randint(0, 5 * 365 * 86400),
+                              microseconds=generator.randint(0, 999999))
+            for _ in range(size)
+        ]
+        self.iso_dates = [date.strftime('%Y-%m-%d') for date in self.dates]
+        self.iso_timestamps = [date.isoformat() + 'Z' for date in self.dates]
+        self.log_lines = [date.strftime('%Y-%m-%d %H:%M:%S') for date in self.dates]
+        self.patterns = [LOG_FORMAT, CSV_FORMAT, 'MMMM D, YYYY', 'YYYY-MM-DD']
+        self.moments = [moment.date(date) for date in self.dates]
+        self.utc_moments = [moment.utc(date) for date in self.dates]
+
+
+@benchmark('parse.iso_date')
+def parse_iso_date(fixtures):
+    strings = fixtures.iso_dates
+    return lambda: [parse_date_and_formula(string) for string in strings]
+
+
+@benchmark('parse.iso_timestamp')
+def parse_iso_timestamp(fixtures):
+    strings = fixtures.iso_timestamps
+    return lambda: [parse_date_and_formula(string) for string in strings]
+
+
+@benchmark('parse.moment_format')
+def parse_moment_format(fixtures):
+    strings = fixtures.log_lines
+    return lambda: [parse_date_and_formula(string, LOG_FORMAT) for string in strings]
+
+
+@benchmark('parse.strftime_format')
+def parse_strftime_format(fixtures):
+    strings = fixtures.log_lines
+    return lambda: [parse_date_and_formula(string, '%Y-%m-%d %H:%M:%S')
+                    for string in strings]
+
+
+@benchmark('parse.parse_many')
+def parse_many(fixtures):
+    strings = fixtures.log_lines
+    return lambda: list(moment.parse_many(strings, LOG_FORMAT))
+
+
+@benchmark('parse.parse_many_cached')
+def parse_many_cached(fixtures):
+    # Logs repeat each second many times over; sorting and repeating the
+    # fixture lines mimics those bursts. The cache holds half of the
+    # distinct lines, so it keeps evicting as it goes.
+    lines = sorted(fixtures.log_lines)[::10]
+    strings = [line for line in lines for _ in range(10)]
+    return _with_parse_cache(strings, len(lines) // 2)
+
+
+@benchmark('parse.parse_many_cached_unique')
+def parse_many_cached_unique(fixtures):
+    # Every line is new and the cache is full after a quarter of them, so
+    # this is the cost of a miss plus an eviction.
+    strings = fixtures.log_lines
+    return _with_parse_cache(strings, len(strings) // 4)
+
+
+def _with_parse_cache(strings, maxsize):
+    def run():
+        enable_parse_cache(maxsize)
+        try:
+            list(moment.parse_many(strings, LOG_FORMAT))
+        finally:
+            disable_parse_cache()
+    return run
+
+
+@benchmark('parse.parse_many_workers')
+def parse_many_workers(fixtures):
+    strings = fixtures.log_lines
+    return _in_workers(lambda: list(moment.parse_many(strings, LOG_FORMAT,
+                                                      workers=WORKERS)))
+
+
+@benchmark('parse.parse_many_workers_epochs')
+def parse_many_workers_epochs(fixtures):
+    strings = fixtures.log_lines
+    return _in_workers(lambda: list(moment.parse_many(strings, LOG_FORMAT, unit='s',
+                                                      workers=WORKERS)))
+
+
+def _in_workers(function):
+    """
+    Run with the process pool on whatever the fixture size, so pool startup
+    is included; pass a large --size to see where the workers pay off.
+    """
+    def run():
+        min_items, parallel.MIN_ITEMS = parallel.MIN_ITEMS, 0
+        try:
+            function()
+        finally:
+            parallel.MIN_ITEMS = min_items
+    return run
+
+
+@benchmark('parse.parse_js_date_cached')
+def parse_js_date_cached(fixtures):
+    patterns = fixtures.patterns * (len(fixtures.dates) // len(fixtures.patterns))
+    return lambda: [parse_js_date(pattern) for pattern in patterns]
+
+
+@benchmark('parse.parse_js_date_uncached')
+def parse_js_date_uncached(fixtures):
+    patterns = fixtures.patterns * (len(fixtures.dates) // len(fixtures.patterns))
+
+    def run():
+        for pattern in patterns:
+            clear_format_cache()
+            parse_js_date(pattern)
+    return run
+
+
+@benchmark('format.log_line')
+def format_log_line(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.format(LOG_FORMAT) for m in moments]
+
+
+@benchmark('format.csv')
+def format_csv(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.format(CSV_FORMAT) for m in moments]
+
+
+@benchmark('format.format_many')
+def format_format_many(fixtures):
+    moments = sorted(fixtures.moments, key=lambda m: m.date)
+    return lambda: list(moment.format_many(moments, LOG_FORMAT))
+
+
+@benchmark('format.format_many_workers')
+def format_format_many_workers(fixtures):
+    moments = sorted(fixtures.moments, key=lambda m: m.date)
+    return _in_workers(lambda: list(moment.format_many(moments, LOG_FORMAT,
+                                                       workers=WORKERS)))
+
+
+@benchmark('format.strftime')
+def format_strftime(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.strftime('%Y-%m-%d %H:%M:%S') for m in moments]
+
+
+@benchmark('arithmetic.clone')
+def arithmetic_clone(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.clone() for m in moments]
+
+
+@benchmark('arithmetic.add_days')
+def arithmetic_add_days(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.clone().add('days', 1) for m in moments]
+
+
+@benchmark('arithmetic.add_months')
+def arithmetic_add_months(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.clone().add('months', 1) for m in moments]
+
+
+@benchmark('arithmetic.add_keywords')
+def arithmetic_add_keywords(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.clone().add(hours=1, minutes=2, seconds=3) for m in moments]
+
+
+@benchmark('arithmetic.start_of_day')
+def arithmetic_start_of_day(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.clone().start_of('day') for m in moments]
+
+
+@benchmark('arithmetic.start_of_week')
+def arithmetic_start_of_week(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.clone().start_of('week') for m in moments]
+
+
+def _start_of_threaded(threads):
+    """
+    Truncate the same four chunks on a pool of `threads` threads, so the
+    1- and 4-thread results show how start_of scales. start_of keeps no
+    shared state, so it needs no lock around it.
+    """
+    def build(fixtures):
+        pool = ThreadPool(threads)
+        chunks = [fixtures.moments[offset::4] for offset in range(4)]
+        truncate = lambda chunk: [m.clone().start_of('day') for m in chunk]
+
+        def close():
+            pool.close()
+            pool.join()
+        return lambda: pool.map(truncate, chunks), close
+    return build
+
+
+benchmark('arithmetic.start_of_threads_1')(_start_of_threaded(1))
+benchmark('arithmetic.start_of_threads_4')(_start_of_threaded(4))
+
+
+@benchmark('arithmetic.end_of_month')
+def arithmetic_end_of_month(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.clone().end_of('month') for m in moments]
+
+
+@benchmark('relative.diff_months')
+def relative_diff_months(fixtures):
+    moments, reference = fixtures.moments, fixtures.moments[0]
+    return lambda: [m.diff(reference, 'months') for m in moments]
+
+
+@benchmark('relative.from_now')
+def relative_from_now(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.from_now() for m in moments]
+
+
+@benchmark('relative.humanize_many')
+def relative_humanize_many(fixtures):
+    moments = fixtures.moments
+    return lambda: moment.humanize_many(moments)
+
+
+@benchmark('timezone.convert')
+def timezone_convert(fixtures):
+    moments = fixtures.utc_moments
+    return lambda: [m.clone().timezone('US/Eastern') for m in moments]
+
+
+@benchmark('timezone.convert_zoneinfo')
+def timezone_convert_zoneinfo(fixtures):
+    return _with_backend('zoneinfo', timezone_convert(fixtures))
+
+
+@benchmark('timezone.locale')
+def timezone_locale(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.clone().locale('US/Pacific') for m in moments]
+
+
+@benchmark('timezone.locale_zoneinfo')
+def timezone_locale_zoneinfo(fixtures):
+    return _with_backend('zoneinfo', timezone_locale(fixtures))
+
+
+def _with_backend(name, function):
+    """Run `function` under time zone backend `name`, if it's installed."""
+    try:
+        moment.set_timezone_backend(name)
+    except ImportError:
+        return None
+    moment.set_timezone_backend('pytz')
+
+    def run():
+        moment.set_timezone_backend(name)
+        try:
+            return function()
+        finally:
+            moment.set_timezone_backend('pytz')
+    return run
+
+
+@benchmark('epoch.seconds')
+def epoch_seconds(fixtures):
+    moments = fixtures.moments
+    return lambda: [m.epoch() for m in moments]
+
+
+@benchmark('epoch.unix_ms')
+def epoch_unix_ms(fixtures):
+    timestamps = [int(moment.date(date).epoch(milliseconds=True)) for date in fixtures.dates]
+    return lambda: [moment.unix(timestamp, utc=True) for timestamp in timestamps]
+
+
+@benchmark('epoch.unix_many')
+def epoch_unix_many(fixtures):
+    timestamps = [int(moment.date(date).epoch(milliseconds=True)) for date in fixtures.dates]
+    return lambda: list(moment.unix_many(timestamps, utc=True, unit='ms'))
+
+
+def run(names=None, repeat=5, number=3, size=SIZE):
+    """Run the selected benchmarks and return {name: microseconds per item}."""
+    fixtures = Fixtures(size)
+    results = {}
+    for name, build in BENCHMARKS:
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        function = build(fixtures)
+        if function is None:
+            continue
+        close = None
+        if isinstance(function, tuple):
+            function, close = function
+        try:
+            best = min(timeit.repeat(function, repeat=repeat, number=number))
+        finally:
+            if close is not None:
+                close()
+        results[name] = best / number / size * 1e6
+        print('%-32s %10.3f us' % (name, results[name]))
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """Print each benchmark against a saved baseline."""
+    print('')
+    print('%-32s %10s %10s %8s' % ('benchmark', 'baseline', 'current', 'change'))
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        change = results[name] / baseline[name] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  slower'
+        elif change < -threshold:
+            flag = '  faster'
+        print('%-32s %10.3f %10.3f %+7.1f%%%s' % (
+            name, baseline[name], results[name], change * 100, flag))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('names', nargs='*', help='only run benchmarks with these prefixes')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='compare against a JSON baseline')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=3)
+    parser.add_argument('--size', type=int, default=SIZE)
+    args = parser.parse_args(argv)
+
+    results = run(args.names, args.repeat, args.number, args.size)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'implementation': platform.python_implementation(),
+                'machine': platform.machine(),
+                'size': args.size,
+                'results': results,
+            }, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline)['results'])
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,3 @@
 from .api import *
-from .core import Moment
+from .business import BusinessCalendar
+from .core import EpochMoment, FrozenMoment, Moment
@@ -2,7 +2,14 @@
 Simple API functionality.
 """
 
+from .buckets import bucket as _bucket, group_buckets as _group_buckets
 from .core import Moment
+from .date import from_epoch_many as _from_epoch_many
+from .parse import format_many as _format_many, parse_many as _parse_many
+from .ranges import Range
+from .relative import humanize_many as _humanize_many
+from .wire import decode as _decode, encode as _encode
+from .zones import get_backend as _get_backend, set_backend as _set_backend
 
 
 def date(*args):
@@ -25,6 +32,74 @@ def utcnow():
     return Moment().utcnow()
 
 
-def unix(timestamp, utc=False):
+def unix(timestamp, utc=False, unit='auto'):
     """Create a date from a Unix timestamp."""
-    return Moment().unix(timestamp, utc)
+    return Moment().unix(timestamp, utc, unit)
+
+
+def unix_many(timestamps, utc=False, unit='auto'):
+    """Lazily turn many Unix timestamps into datetimes."""
+    return _from_epoch_many(timestamps, unit, utc)
+
+
+def parse_many(strings, formula=None, tz=None, unit=None, errors=None, workers=None):
+    """
+    Lazily parse many strings with one formula into datetimes or epochs.
+    Large batches are split across `workers` processes when given.
+    """
+    if workers:
+        from .parallel import parallel_parse_many
+        return parallel_parse_many(strings, formula, tz, unit, errors, workers)
+    return _parse_many(strings, formula, tz, unit, errors)
+
+
+def format_many(moments, pattern, tz=None, stream=None, unit='auto', workers=None):
+    """
+    Format many moments, datetimes or epochs with one pattern, lazily or
+    as lines written to `stream`. Large batches are split across
+    `workers` processes when given.
+    """
+    if workers:
+        from .parallel import parallel_format_many
+        return parallel_format_many(moments, pattern, tz, stream, unit, workers)
+    return _format_many(moments, pattern, tz, stream, unit)
+
+
+def range(start, end, step='1 day', align=None, unit=None):
+    """Lazily iterate from start up to end, e.g. step='15 minutes'."""
+    return Range(start, end, step, align, unit)
+
+
+def bucket(timestamps, unit, tz=None):
+    """Lazily map Unix timestamps to the start of their time bucket."""
+    return _bucket(timestamps, unit, tz)
+
+
+def group_buckets(values, unit, tz=None, key=None, items=False):
+    """Group consecutive timestamps by bucket, yielding counts or items."""
+    return _group_buckets(values, unit, tz, key, items)
+
+
+def humanize_many(moments, reference=None, suffix=True):
+    """Humanize many moments against one reference instant (default now)."""
+    return _humanize_many(moments, reference, suffix)
+
+
+def encode_many(moments):
+    """Pack moments or datetimes into compact bytes for other processes."""
+    return _encode(moments)
+
+
+def decode_many(data):
+    """Unpack bytes from `encode_many` into a list of moments."""
+    return _decode(data)
+
+
+def set_timezone_backend(name):
+    """Resolve time zones with 'pytz' (the default) or 'zoneinfo'."""
+    _set_backend(name)
+
+
+def get_timezone_backend():
+    """Name of the time zone backend in use."""
+    return _get_backend()
@@ -0,0 +1,164 @@
+"""
+Map streams of Unix timestamps onto time buckets. Fixed-length buckets are
+plain integer arithmetic; calendar buckets (and days in a time zone, which
+DST can stretch or shrink) are found by bisecting a cached table of bucket
+boundaries that grows as new timestamps arrive.
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from threading import Lock
+
+from .date import (EPOCH, MONTH_UNITS, epoch_microseconds, normalize_unit,
+                   total_microseconds)
+from .months import shift_months
+from .zones import get_index
+
+
+# Bucket widths, in seconds, for units that never change length in UTC.
+FIXED_WIDTHS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400,
+                'week': 604800}
+
+# Weeks start on Sunday; the epoch fell on a Thursday.
+WEEK_OFFSET = 4 * 86400
+
+# How many boundaries to add past the one a timestamp needed.
+MARGIN = 64
+
+_TABLES = {}
+_TABLES_LOCK = Lock()
+
+
+def bucketer(unit, tz=None):
+    """
+    Return a function mapping a Unix timestamp (in seconds) to the start of
+    its bucket, as integer seconds. Buckets are aligned to local time in
+    `tz` when given; weeks start on Sunday.
+    """
+    name = normalize_unit(unit)
+    if name not in FIXED_WIDTHS and name not in MONTH_UNITS:
+        raise ValueError("unknown bucket unit %r" % (unit,))
+    if tz in (None, 'UTC') and name in FIXED_WIDTHS:
+        width = FIXED_WIDTHS[name]
+        offset = WEEK_OFFSET if name == 'week' else 0
+        return lambda timestamp: int(timestamp - (timestamp + offset) % width)
+    if name in ('second', 'minute', 'hour'):
+        width = FIXED_WIDTHS[name]
+        utcoffset = get_index(tz).utcoffset
+
+        def find(timestamp):
+            offset = utcoffset(timestamp)
+            return int(timestamp - (timestamp + offset) % width)
+        return find
+    return boundaries(name, tz).find
+
+
+def bucket(timestamps, unit, tz=None):
+    """Lazily map each Unix timestamp to the start of its bucket."""
+    find = bucketer(unit, tz)
+    for timestamp in timestamps:
+        yield find(timestamp)
+
+
+def group_buckets(values, unit, tz=None, key=None, items=False):
+    """
+    Group consecutive values falling in the same bucket in one pass,
+    yielding `(bucket, count)`, or `(bucket, values)` when `items` is true.
+    `key` extracts the timestamp from each value. Input is expected to be
+    roughly time-ordered; a bucket that reappears later is yielded again.
+    """
+    find = bucketer(unit, tz)
+    current = None
+    members = []
+    count = 0
+    for value in values:
+        start = find(key(value) if key is not None else value)
+        if start != current:
+            if count:
+                yield current, (members if items else count)
+            current, members, count = start, [], 0
+        count += 1
+        if items:
+            members.append(value)
+    if count:
+        yield current, (members if items else count)
+
+
+def boundaries(unit, tz=None):
+    """Return the shared `Boundaries` table for a canonical unit and zone."""
+    key = (unit, tz)
+    try:
+        return _TABLES[key]
+    except KeyError:
+        with _TABLES_LOCK:
+            if key not in _TABLES:
+                _TABLES[key] = Boundaries(unit, tz)
+            return _TABLES[key]
+
+
+class Boundaries(object):
+    """
+    Sorted bucket start times, in epoch seconds, for one calendar unit in
+    one zone. The table covers a contiguous span and is extended when a
+    timestamp falls outside it.
+    """
+
+    def __init__(self, unit, tz=None):
+        self.unit = unit
+        self.tz = tz
+        self.starts = []
+        self._local = []
+        self._lock = Lock()
+
+    def find(self, timestamp):
+        """Start of the bucket containing `timestamp`."""
+        starts = self.starts
+        if not starts or not starts[0] <= timestamp < starts[-1]:
+            starts = self._extend(timestamp)
+        return starts[bisect_right(starts, timestamp) - 1]
+
+    def _extend(self, timestamp):
+        with self._lock:
+            start = self._truncate(self._to_local(timestamp))
+            local, starts = list(self._local), list(self.starts)
+            if not local or start < local[0]:
+                stop = local[0] if local else self._step(start, 1)
+                before = [self._step(start, -MARGIN)]
+                while self._step(before[-1], 1) < stop:
+                    before.append(self._step(before[-1], 1))
+                local = before + local
+                starts = [self._to_epoch(value) for value in before] + starts
+            if local[-1] <= start:
+                last = self._step(start, MARGIN)
+                while local[-1] < last:
+                    local.append(self._step(local[-1], 1))
+                    starts.append(self._to_epoch(local[-1]))
+            self._local, self.starts = local, starts
+            return starts
+
+    def _to_local(self, timestamp):
+        if self.tz is None:
+            return EPOCH + timedelta(seconds=timestamp)
+        return get_index(self.tz).from_utc(timestamp).replace(tzinfo=None)
+
+    def _to_epoch(self, local):
+        if self.tz is None:
+            return total_microseconds(local - EPOCH) // 1000000
+        return epoch_microseconds(get_index(self.tz).zone.localize(local)) // 1000000
+
+    def _truncate(self, local):
+        if self.unit == 'year':
+            return datetime(local.year, 1, 1)
+        if self.unit == 'quarter':
+            return datetime(local.year, (local.month - 1) // 3 * 3 + 1, 1)
+        if self.unit == 'month':
+            return datetime(local.year, local.month, 1)
+        day = datetime(local.year, local.month, local.day)
+        if self.unit == 'week':
+            return day - timedelta(days=day.isoweekday() % 7)
+        return day
+
+    def _step(self, local, count):
+        if self.unit in MONTH_UNITS:
+            return shift_months(local, count * MONTH_UNITS[self.unit])
+        return local + timedelta(days=count * (7 if self.unit == 'week' else 1))
@@ -0,0 +1,109 @@
+"""
+Business-day arithmetic. Each calendar keeps a sorted index of the
+business days it has seen so far, built lazily a year or more at a time,
+so counting and offsetting are bisects no matter how long the span is.
+"""
+
+from bisect import bisect_left
+from datetime import date as Date, datetime, timedelta
+from threading import Lock
+
+
+# Days past what a query needs that get indexed, so nearby queries reuse it.
+MARGIN = 366
+
+
+class BusinessCalendar(object):
+    """
+    Business days are the weekdays not in `weekend` (0 is Monday, as in
+    `datetime.weekday`) and not in `holidays`, which may be dates,
+    datetimes or moments.
+    """
+
+    def __init__(self, holidays=(), weekend=(5, 6)):
+        self.weekend = frozenset(weekend)
+        if len(self.weekend) >= 7:
+            raise ValueError("a calendar needs at least one business weekday")
+        self.holidays = frozenset(_ordinal(holiday) for holiday in holidays)
+        self._days = []
+        self._span = (0, 0)
+        self._lock = Lock()
+
+    @classmethod
+    def from_file(cls, path, weekend=(5, 6)):
+        """
+        Load holidays from a text file with one YYYY-MM-DD date per line.
+        Anything after the date, and lines starting with '#', are ignored.
+        """
+        holidays = []
+        with open(path) as lines:
+            for line in lines:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    holidays.append(datetime.strptime(line[:10], '%Y-%m-%d'))
+        return cls(holidays, weekend)
+
+    def is_business_day(self, date):
+        """Whether `date` falls on a business day."""
+        ordinal = _ordinal(date)
+        return (ordinal + 6) % 7 not in self.weekend and ordinal not in self.holidays
+
+    def add_business_days(self, date, days):
+        """
+        The date `days` business days after `date` (before it, if negative),
+        keeping its time of day. Counting starts from the next business day,
+        so one business day after a Saturday is the following Monday.
+        """
+        if not days:
+            return date
+        ordinal = _ordinal(date)
+        if days > 0 and not self.is_business_day(date):
+            days -= 1
+        # Enough days to hold the answer unless holidays push it further out.
+        reach = abs(days) * 7 // (7 - len(self.weekend)) + 7
+        while True:
+            index = self._index(ordinal - reach, ordinal + reach)
+            position = bisect_left(index, ordinal) + days
+            if 0 <= position < len(index):
+                return date + timedelta(days=index[position] - ordinal)
+            reach *= 2
+
+    def business_days_between(self, start, end):
+        """
+        Business days from `start` up to, but not including, `end`; negative
+        when `end` comes first.
+        """
+        first, last = _ordinal(start), _ordinal(end)
+        index = self._index(min(first, last), max(first, last))
+        return bisect_left(index, last) - bisect_left(index, first)
+
+    def _index(self, first, last):
+        """The sorted business-day ordinals, covering `first` to `last`."""
+        low, high = self._span
+        if low <= first and last <= high:
+            return self._days
+        with self._lock:
+            low, high = self._span
+            if not self._days:
+                low = high = first
+            low, high = min(low, first - MARGIN), max(high, last + MARGIN)
+            weekend, holidays = self.weekend, self.holidays
+            days = [ordinal for ordinal in range(low, self._span[0] or high)
+                    if (ordinal + 6) % 7 not in weekend and ordinal not in holidays]
+            if self._days:
+                days.extend(self._days)
+                days.extend(ordinal for ordinal in range(self._span[1], high)
+                            if (ordinal + 6) % 7 not in weekend
+                            and ordinal not in holidays)
+            self._days, self._span = days, (low, high)
+            return days
+
+
+# Monday to Friday, without holidays.
+WEEKDAYS = BusinessCalendar()
+
+
+def _ordinal(value):
+    if not isinstance(value, Date):
+        value = value.date
+    return value.toordinal()
@@ -1,17 +1,20 @@
-from calendar import timegm
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import wraps
 from time import timezone
 
-import pytz
-import times
-
-from .date import MutableDate
-from .parse import parse_date_and_formula, parse_js_date
+from .date import (EPOCH, MutableDate, difference, epoch_microseconds,
+                   from_epoch, total_microseconds)
+from .parse import compile_format, parse_date_and_formula
+from .relative import humanize, now_like, seconds_between
+from .utils import string_types
+from .zones import from_zone_key, get_zone, localize, to_zone, zone_key
 
 
 class Moment(MutableDate):
     """A class to abstract date difficulties."""
 
+    __slots__ = ('_formula',)
+
     def __init__(self, *args):
         if args:
             date, formula = parse_date_and_formula(*args)
@@ -31,40 +34,39 @@ class Moment(MutableDate):
     def utc(self, *args):
         """Create a moment from a UTC date."""
         date, formula = parse_date_and_formula(*args)
-        self._date = pytz.timezone('UTC').localize(date)
+        if date.tzinfo is None:
+            self._date = localize(date, 'UTC')
+        else:
+            self._date = date.astimezone(get_zone('UTC'))
         self._formula = formula
         return self
 
     def utcnow(self):
         """UTC equivalent to now."""
-        self._date = pytz.timezone('UTC').localize(datetime.utcnow())
+        self._date = localize(datetime.utcnow(), 'UTC')
         self._formula = "%Y-%m-%d"
         return self
 
-    def unix(self, timestamp, utc=False):
-        """Create a date from a Unix timestamp."""
-        if utc:
-            fromtimestamp = datetime.utcfromtimestamp
-        else:
-            fromtimestamp = datetime.fromtimestamp
-        try:
-            # Seconds since epoch
-            self._date = fromtimestamp(timestamp)
-        except ValueError:
-            # Milliseconds since epoch
-            self._date = fromtimestamp(timestamp / 1000)
+    def unix(self, timestamp, utc=False, unit='auto'):
+        """
+        Create a date from a Unix timestamp in seconds, milliseconds,
+        microseconds or nanoseconds. With unit='auto' the unit is guessed
+        from the timestamp's magnitude.
+        """
+        self._date = from_epoch(timestamp, unit, utc)
         self._formula = "%Y-%m-%d"
         return self
 
     def locale(self, zone=None):
         """Explicitly set the time zone you want to work with."""
         if not zone:
-            self._date = datetime.fromtimestamp(timegm(self._date.timetuple()))
+            seconds = total_microseconds(self._date.replace(tzinfo=None) - EPOCH)
+            self._date = datetime.fromtimestamp(seconds // 1000000)
         else:
             try:
-                self._date = pytz.timezone(zone).localize(self._date)
+                self._date = localize(self._date, zone)
             except ValueError:
-                self._date = self._date.replace(tzinfo=pytz.timezone(zone))
+                self._date = self._date.replace(tzinfo=get_zone(zone))
         return self
 
     def timezone(self, zone):
@@ -72,27 +74,34 @@ class Moment(MutableDate):
         Change the time zone and affect the current moment's time. Note, a
         locality must already be set.
         """
-        date = self._date
-        try:
-            date = times.to_local(times.to_universal(date), zone)
-        except Exception:
-            date = times.to_local(date, zone)
-        finally:
-            self._date = date
+        self._date = to_zone(self._date, zone)
         return self
 
     def format(self, formula):
         """Display the moment in a given format."""
-        formula = parse_js_date(formula)
-        return self._date.strftime(formula)
+        return compile_format(formula).render(self._date)
 
     def strftime(self, formula):
         """Takes a Pythonic format, rather than the JS version."""
         return self._date.strftime(formula)
 
-    def diff(self, moment):
-        """Return the difference between moments."""
-        return self - moment
+    def diff(self, moment, unit=None, precise=False):
+        """
+        Return the difference between moments: a timedelta, or a number of
+        `unit` (truncated unless `precise`). Months, quarters and years are
+        calendar-correct.
+        """
+        other = moment.date if isinstance(moment, MutableDate) else moment
+        return difference(self._date, other, unit, precise)
+
+    def from_now(self, suffix=True):
+        """Humanized time relative to now, such as '3 hours ago'."""
+        return humanize(seconds_between(self._date, now_like(self._date)), suffix)
+
+    def to(self, moment, suffix=True):
+        """Humanized time from this moment to another, such as 'in a day'."""
+        other = moment.date if isinstance(moment, MutableDate) else moment
+        return humanize(seconds_between(other, self._date), suffix)
 
     def done(self):
         """Return the datetime representation."""
@@ -100,18 +109,210 @@ class Moment(MutableDate):
 
     def clone(self):
         """Return a clone of the current moment."""
-        return Moment(self._date)
+        return self._copy()
 
     def copy(self):
         """Same as clone."""
-        return Moment(self._date)
+        return self._copy()
+
+    def freeze(self):
+        """Return an immutable copy of the current moment."""
+        return self._copy(FrozenMoment)
+
+    def _copy(self, cls=None):
+        """Copy the moment's state into a new instance without re-parsing."""
+        moment = object.__new__(cls or type(self))
+        moment._date = self._date
+        moment._formula = self._formula
+        return moment
+
+    def __reduce__(self):
+        date = self._date
+        if date is None:
+            return _restore, (type(self), None)
+        formula = (self._formula,) if self._formula != "%Y-%m-%d" else ()
+        # The compact form only when it rebuilds the same wall clock and
+        # offset; plain dates, datetime subclasses and tzinfos that aren't
+        # normalized to their zone (such as pytz's LMT) are pickled as is.
+        if type(date) is datetime:
+            microseconds, zone = epoch_microseconds(date), zone_key(date.tzinfo)
+            rebuilt = _from_instant(microseconds, zone)
+            if (rebuilt.replace(tzinfo=None) == date.replace(tzinfo=None)
+                    and rebuilt.utcoffset() == date.utcoffset()):
+                return _restore, (type(self), microseconds, zone) + formula
+        return _restore_date, (type(self), date) + formula
 
     def __repr__(self):
+        name = type(self).__name__
         if self._date is not None:
-            return "<Moment(%s)>" % (self._date.strftime(self._formula))
-        return "<Moment>"
+            formula = self._formula or "%Y-%m-%d"
+            return "<%s(%s)>" % (name, self._date.strftime(formula))
+        return "<%s>" % name
 
     def __str__(self):
         formatted = self._date.strftime('%Y-%m-%dT%H:%M:%S')
         tz = str.format('{0:+06.2f}', -float(timezone) / 3600)
         return formatted + tz
+
+
+def _restore(cls, microseconds, zone=None, formula="%Y-%m-%d"):
+    """Rebuild a pickled moment from its instant and zone."""
+    if microseconds is not None and issubclass(cls, EpochMoment):
+        moment = cls.from_microseconds(microseconds, from_zone_key(zone))
+        moment._formula = formula
+        return moment
+    date = None if microseconds is None else _from_instant(microseconds, zone)
+    return _restore_date(cls, date, formula)
+
+
+def _restore_date(cls, date, formula="%Y-%m-%d"):
+    """Rebuild a pickled moment around the date it held."""
+    moment = object.__new__(cls)
+    moment._date = date
+    moment._formula = formula
+    return moment
+
+
+def _from_instant(microseconds, zone):
+    """The datetime for microseconds since epoch, in the zone of a `zone_key`."""
+    tz = from_zone_key(zone)
+    date = EPOCH + timedelta(microseconds=microseconds)
+    if tz is not None:
+        date = tz.fromutc(date.replace(tzinfo=tz))
+    return date
+
+
+def _returns_copy(method):
+    """Run a mutating Moment method on a copy and freeze the result."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        moment = self._copy(Moment)
+        method(moment, *args, **kwargs)
+        moment.__class__ = type(self)
+        return moment
+    return wrapper
+
+
+class FrozenMoment(Moment):
+    """
+    An immutable moment. Every method that would change a Moment in place
+    returns a new FrozenMoment instead, so copies are never needed.
+    """
+
+    __slots__ = ()
+
+    now = _returns_copy(Moment.now)
+    utc = _returns_copy(Moment.utc)
+    utcnow = _returns_copy(Moment.utcnow)
+    unix = _returns_copy(Moment.unix)
+    locale = _returns_copy(Moment.locale)
+    timezone = _returns_copy(Moment.timezone)
+    add = _returns_copy(Moment.add)
+    sub = _returns_copy(Moment.sub)
+    subtract = _returns_copy(Moment.subtract)
+    start_of = _returns_copy(Moment.start_of)
+    end_of = _returns_copy(Moment.end_of)
+    replace = _returns_copy(Moment.replace)
+    add_business_days = _returns_copy(Moment.add_business_days)
+
+    def clone(self):
+        """A frozen moment never changes, so it is its own clone."""
+        return self
+
+    def copy(self):
+        """Same as clone."""
+        return self
+
+    def freeze(self):
+        """Already frozen."""
+        return self
+
+    def thaw(self):
+        """Return a mutable Moment copy."""
+        return self._copy(Moment)
+
+    @property
+    def zero(self):
+        """Get rid of hour, minute, second, and microsecond information."""
+        return self.replace(hours=0, minutes=0, seconds=0, microseconds=0)
+
+    def __hash__(self):
+        return hash(self._date)
+
+
+class EpochMoment(Moment):
+    """
+    A moment stored as integer microseconds since epoch plus a tzinfo.
+    Fixed-unit arithmetic and `epoch` are integer operations, and the
+    datetime is only built when calendar fields are read. Because the
+    instant is what's stored, adding hours or days to an aware moment
+    moves it in absolute time and re-localizes it across DST changes.
+    """
+
+    __slots__ = ('_microseconds', '_tz', '_cache')
+
+    @classmethod
+    def from_microseconds(cls, microseconds, tz=None):
+        """Create a moment from microseconds since epoch and an optional tz."""
+        moment = cls()
+        moment._microseconds = microseconds
+        moment._tz = get_zone(tz) if isinstance(tz, string_types) else tz
+        moment._formula = "%Y-%m-%d"
+        return moment
+
+    def _get_date(self):
+        date = self._cache
+        if date is None and self._microseconds is not None:
+            date = EPOCH + timedelta(microseconds=self._microseconds)
+            if self._tz is not None:
+                date = self._tz.fromutc(date.replace(tzinfo=self._tz))
+            self._cache = date
+        return date
+
+    def _set_date(self, date):
+        self._cache = date
+        if date is None:
+            self._microseconds = self._tz = None
+        else:
+            self._microseconds = epoch_microseconds(date)
+            self._tz = date.tzinfo
+
+    _date = property(_get_date, _set_date)
+
+    def _shift(self, months, microseconds):
+        if months or self._microseconds is None:
+            return super(EpochMoment, self)._shift(months, microseconds)
+        self._microseconds += int(round(microseconds))
+        self._cache = None
+        return self
+
+    def epoch(self, rounding=True, milliseconds=False):
+        """Seconds (or milliseconds) since epoch, using integer math."""
+        microseconds = self._microseconds
+        if microseconds is None:
+            return None
+        if rounding:
+            seconds = (microseconds + 500000) // 1000000
+            return seconds * 1000 if milliseconds else seconds
+        if milliseconds:
+            return microseconds / 1000.0
+        return microseconds / 1000000.0
+
+    def __reduce__(self):
+        if self._microseconds is None:
+            return _restore, (type(self), None)
+        state = (type(self), self._microseconds, zone_key(self._tz))
+        if self._formula != "%Y-%m-%d":
+            state += (self._formula,)
+        return _restore, state
+
+    def _copy(self, cls=None):
+        cls = cls or type(self)
+        if not issubclass(cls, EpochMoment):
+            return super(EpochMoment, self)._copy(cls)
+        moment = object.__new__(cls)
+        moment._microseconds = self._microseconds
+        moment._tz = self._tz
+        moment._cache = self._cache
+        moment._formula = self._formula
+        return moment
@@ -2,66 +2,246 @@
 Where the magic happens.
 """
 
-import calendar
 from datetime import datetime, timedelta
 
-from .utils import switch, case
+from .business import WEEKDAYS
+from .months import shift_months
+
+
+EPOCH = datetime(1970, 1, 1)
+
+# Nanoseconds in each supported epoch unit.
+EPOCH_UNITS = {'s': 1000000000, 'ms': 1000000, 'us': 1000, 'ns': 1}
+
+
+# Upper bounds used to guess the unit of an epoch from its magnitude: below
+# 1e11 is seconds (up to the year 5138), below 1e14 milliseconds, and so on.
+EPOCH_MAGNITUDES = ((10 ** 11, 's'), (10 ** 14, 'ms'), (10 ** 17, 'us'))
+
+
+def total_microseconds(delta):
+    """Length of a timedelta as an integer number of microseconds."""
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def epoch_microseconds(date):
+    """Integer microseconds since epoch. Naive dates are treated as UTC."""
+    if date.tzinfo is not None:
+        date = date.replace(tzinfo=None) - date.utcoffset()
+    return total_microseconds(date - EPOCH)
+
+
+def to_epoch(date, unit='s'):
+    """Integer time since epoch in the given unit ('s', 'ms', 'us' or 'ns')."""
+    return epoch_microseconds(date) * 1000 // EPOCH_UNITS[unit]
+
+
+def guess_epoch_unit(timestamp):
+    """Guess whether an epoch is in 's', 'ms', 'us' or 'ns' from its size."""
+    magnitude = abs(timestamp)
+    for limit, unit in EPOCH_MAGNITUDES:
+        if magnitude < limit:
+            return unit
+    return 'ns'
+
+
+def epoch_scale(unit):
+    """Nanoseconds per `unit`, which must be one of EPOCH_UNITS."""
+    try:
+        return EPOCH_UNITS[unit]
+    except KeyError:
+        raise ValueError("unknown epoch unit %r" % (unit,))
+
+
+def from_epoch(timestamp, unit='s', utc=True):
+    """
+    Naive datetime for an epoch in `unit`, or 'auto' to guess the unit.
+    The result is in UTC, or in local time when `utc` is false. Integer
+    epochs are converted with integer arithmetic only, so no precision is
+    lost to floats.
+    """
+    if unit == 'auto':
+        unit = guess_epoch_unit(timestamp)
+    return next(from_epoch_many((timestamp,), unit, utc))
+
+
+def from_epoch_many(timestamps, unit='s', utc=True):
+    """Lazily convert many epochs, resolving a fixed unit only once."""
+    scale = None if unit == 'auto' else epoch_scale(unit)
+    fromtimestamp = datetime.fromtimestamp
+    for timestamp in timestamps:
+        if scale is None:
+            nanoseconds = EPOCH_UNITS[guess_epoch_unit(timestamp)]
+        else:
+            nanoseconds = scale
+        if isinstance(timestamp, float):
+            microseconds = int(round(timestamp * nanoseconds / 1000.0))
+        else:
+            microseconds = timestamp * nanoseconds // 1000
+        if utc:
+            yield EPOCH + timedelta(microseconds=microseconds)
+            continue
+        seconds, microsecond = divmod(microseconds, 1000000)
+        date = fromtimestamp(seconds)
+        yield date.replace(microsecond=microsecond) if microsecond else date
+
+
+# Every accepted spelling of a unit, including Moment.js shorthands, mapped
+# to its canonical name.
+UNIT_ALIASES = {
+    'years': 'year', 'year': 'year', 'y': 'year',
+    'quarters': 'quarter', 'quarter': 'quarter', 'Q': 'quarter',
+    'months': 'month', 'month': 'month', 'M': 'month',
+    'weeks': 'week', 'week': 'week', 'w': 'week',
+    'days': 'day', 'day': 'day', 'd': 'day',
+    'hours': 'hour', 'hour': 'hour', 'h': 'hour',
+    'minutes': 'minute', 'minute': 'minute', 'm': 'minute',
+    'seconds': 'second', 'second': 'second', 's': 'second',
+    'milliseconds': 'millisecond', 'millisecond': 'millisecond', 'ms': 'millisecond',
+    'microseconds': 'microsecond', 'microsecond': 'microsecond', 'us': 'microsecond',
+}
+
+# Canonical units that are a whole number of months long.
+MONTH_UNITS = {'year': 12, 'quarter': 3, 'month': 1}
+
+# Canonical units that are a fixed number of microseconds long.
+MICROSECOND_UNITS = {
+    'week': 604800000000,
+    'day': 86400000000,
+    'hour': 3600000000,
+    'minute': 60000000,
+    'second': 1000000,
+    'millisecond': 1000,
+    'microsecond': 1,
+}
+
+# Canonical units that can be passed to `replace`, and the datetime field
+# each one sets.
+REPLACE_FIELDS = {
+    'year': 'year',
+    'month': 'month',
+    'day': 'day',
+    'hour': 'hour',
+    'minute': 'minute',
+    'second': 'second',
+    'microsecond': 'microsecond',
+}
+
+
+# The datetime fields reset when truncating to each canonical unit.
+_FIELDS = (('month', 1), ('day', 1), ('hour', 0), ('minute', 0), ('second', 0),
+           ('microsecond', 0))
+TRUNCATIONS = {
+    'year': dict(_FIELDS[0:]),
+    'quarter': dict(_FIELDS[1:]),
+    'month': dict(_FIELDS[1:]),
+    'week': dict(_FIELDS[2:]),
+    'day': dict(_FIELDS[2:]),
+    'hour': dict(_FIELDS[3:]),
+    'minute': dict(_FIELDS[4:]),
+    'second': dict(_FIELDS[5:]),
+}
+
+
+def normalize_unit(unit):
+    """Return the canonical name of a unit, or None if it isn't known."""
+    return UNIT_ALIASES.get(unit)
+
+
+def split_units(unit=None, amount=None, units=None):
+    """
+    Coalesce a unit/amount pair and a dict of units into a total number of
+    months and a total number of microseconds.
+    """
+    months = microseconds = 0
+    if unit is not None:
+        unit = UNIT_ALIASES.get(unit)
+        if unit in MONTH_UNITS:
+            months = amount * MONTH_UNITS[unit]
+        elif unit is not None:
+            microseconds = amount * MICROSECOND_UNITS[unit]
+    if units:
+        for name, value in units.items():
+            name = UNIT_ALIASES.get(name)
+            if name in MONTH_UNITS:
+                months += value * MONTH_UNITS[name]
+            elif name is not None:
+                microseconds += value * MICROSECOND_UNITS[name]
+    return months, microseconds
+
+
+def difference(date, other, unit=None, precise=False):
+    """
+    `date - other`: a timedelta without a unit, otherwise a number of that
+    unit, truncated towards zero unless `precise` is set. Months, quarters
+    and years count calendar months on the wall clock of `date`'s zone, and
+    days and weeks leave out any change in UTC offset between the two, so a
+    day across a DST switch is still one day, as in Moment.js.
+    """
+    if unit is None:
+        return date - other
+    name = normalize_unit(unit)
+    if name in MONTH_UNITS:
+        if date.tzinfo is not None and other.tzinfo is not None:
+            other = other.astimezone(date.tzinfo)
+        months = month_difference(date.replace(tzinfo=None), other.replace(tzinfo=None))
+        months /= MONTH_UNITS[name]
+        return months if precise else int(months)
+    if name not in MICROSECOND_UNITS:
+        raise ValueError("unknown unit %r" % (unit,))
+    microseconds, size = total_microseconds(date - other), MICROSECOND_UNITS[name]
+    if name in ('day', 'week') and date.tzinfo is not None and other.tzinfo is not None:
+        microseconds += total_microseconds(date.utcoffset() - other.utcoffset())
+    if precise:
+        return microseconds / float(size)
+    count = abs(microseconds) // size
+    return count if microseconds >= 0 else -count
+
+
+def month_difference(date, other):
+    """
+    Months from `other` to `date` as a float, the way Moment.js counts them:
+    whole calendar months, plus the remainder as a fraction of the month it
+    falls in.
+    """
+    months = (other.year - date.year) * 12 + other.month - date.month
+    anchor = shift_months(date, months)
+    remainder = total_microseconds(other - anchor)
+    if remainder < 0:
+        length = total_microseconds(anchor - shift_months(date, months - 1))
+    else:
+        length = total_microseconds(shift_months(date, months + 1) - anchor)
+    return -(months + remainder / float(length))
 
 
 def add_month(date, number):
     """Add a number of months to a date."""
-    month = date.month - 1 + number
-    return update_month(date, month)
+    return shift_months(date, number)
 
 
 def subtract_month(date, number):
     """Subtract a number of months from a date."""
-    month = date.month - 1 - number
-    return update_month(date, month)
+    return shift_months(date, -number)
 
 
 def update_month(date, month):
     """Create a new date with a modified number of months."""
-    year = date.year + month / 12
-    month = month % 12 + 1
-    day = min(date.day, calendar.monthrange(year, month)[1])
-    return date.replace(year=year, month=month, day=day)
+    return shift_months(date, month - (date.month - 1))
 
 
 class MutableDate(object):
     """Incapsulate mutable dates in one class."""
 
+    __slots__ = ('_date',)
+
     def __init__(self, date):
         super(MutableDate, self).__init__()
         self._date = date
 
     def add(self, unit=None, amount=None, **kwargs):
         """Add time to the original moment."""
-        if not unit and not amount and len(kwargs):
-            for k, v in kwargs.iteritems():
-                self.add(k, v)
-        if unit in ('years', 'year'):
-            self._date = add_month(self._date, amount * 12)
-        elif unit in ('quarters', 'quarter'):
-            self._date = add_month(self._date, amount * 3)
-        elif unit in ('months', 'month'):
-            self._date = add_month(self._date, amount)
-        elif unit in ('weeks', 'week'):
-            self._date += timedelta(weeks=amount)
-        elif unit in ('days', 'day'):
-            self._date += timedelta(days=amount)
-        elif unit in ('hours', 'hour'):
-            self._date += timedelta(hours=amount)
-        elif unit in ('minutes', 'minute'):
-            self._date += timedelta(minutes=amount)
-        elif unit in ('seconds', 'second'):
-            self._date += timedelta(seconds=amount)
-        elif unit in ('milliseconds', 'millisecond'):
-            self._date += timedelta(milliseconds=amount)
-        elif unit in ('microseconds', 'microsecond'):
-            self._date += timedelta(microseconds=amount)
-
-        return self
+        months, microseconds = split_units(unit, amount, kwargs)
+        return self._shift(months, microseconds)
 
     def sub(self, unit=None, amount=None, **kwargs):
         """Just in case."""
@@ -69,86 +249,71 @@ class MutableDate(object):
 
     def subtract(self, unit=None, amount=None, **kwargs):
         """Subtract time from the original moment."""
-        if not unit and not amount and len(kwargs):
-            for k, v in kwargs.iteritems():
-                self.subtract(k, v)
-        if unit in ('years', 'year'):
-            self._date = subtract_month(self._date, amount * 12)
-        elif unit in ('quarters', 'quarter'):
-            self._date = subtract_month(self._date, amount * 3)
-        elif unit in ('months', 'month'):
-            self._date = subtract_month(self._date, amount)
-        elif unit in ('weeks', 'week'):
-            self._date -= timedelta(weeks=amount)
-        elif unit in ('days', 'day'):
-            self._date -= timedelta(days=amount)
-        elif unit in ('hours', 'hour'):
-            self._date -= timedelta(hours=amount)
-        elif unit in ('minutes', 'minute'):
-            self._date -= timedelta(minutes=amount)
-        elif unit in ('seconds', 'second'):
-            self._date -= timedelta(seconds=amount)
-        elif unit in ('milliseconds', 'millisecond'):
-            self._date -= timedelta(milliseconds=amount)
-        elif unit in ('microseconds', 'microsecond'):
-            self._date -= timedelta(microseconds=amount)
-
+        months, microseconds = split_units(unit, amount, kwargs)
+        return self._shift(-months, -microseconds)
+
+    def _shift(self, months, microseconds):
+        """Move the date by whole months, then by a number of microseconds."""
+        if months:
+            self._date = add_month(self._date, months)
+        if microseconds:
+            self._date += timedelta(microseconds=microseconds)
         return self
 
     def start_of(self, unit):
-        while switch(unit):
-            if case('years', 'year'):
-                self._date = self._date.replace(month=1)
-            if case('quarters', 'quarter', 'months', 'month'):
-                self._date = self._date.replace(day=1)
-            if case('weeks', 'week', 'days', 'day'):
-                self._date = self._date.replace(hour=0)
-            if case('hours', 'hour'):
-                self._date = self._date.replace(minute=0)
-            if case('minutes', 'minute'):
-                self._date = self._date.replace(second=0)
-            if case('seconds', 'second'):
-                self._date = self._date.replace(microsecond=0)
-                break
-
-            break
-
-        if unit in ('weeks', 'week'):
-            self._weekday(0)
+        unit = normalize_unit(unit)
+        fields = TRUNCATIONS.get(unit)
+        if fields is None:
+            return self
 
-        if unit in ('quarters', 'quarter'):
-            self._date = self._date.replace(month=(self._date.month - 1) / 3 * 3 + 1)
+        if unit == 'quarter':
+            fields = dict(fields, month=(self._date.month - 1) // 3 * 3 + 1)
+        self._date = self._date.replace(**fields)
+
+        if unit == 'week':
+            self._weekday(0)
 
         return self
 
     def end_of(self, unit):
-        if unit in ('microseconds', 'microsecond'):
+        unit = normalize_unit(unit)
+        if unit == 'microsecond':
             return self
 
-        return self.start_of(unit).add(unit=unit, amount=1).subtract(microsecond=1)
+        return self.start_of(unit).add(unit, 1).subtract(microsecond=1)
 
     def replace(self, **kwargs):
         """A Pythonic way to replace various date attributes."""
-        for unit, value in kwargs.iteritems():
-            if unit in ('years', 'year'):
-                self._date = self._date.replace(year=value)
-            elif unit in ('months', 'month'):
-                self._date = self._date.replace(month=value)
-            elif unit in ('days', 'day'):
-                self._date = self._date.replace(day=value)
-            elif unit in ('hours', 'hour'):
-                self._date = self._date.replace(hour=value)
-            elif unit in ('minutes', 'minute'):
-                self._date = self._date.replace(minute=value)
-            elif unit in ('seconds', 'second'):
-                self._date = self._date.replace(second=value)
-            elif unit in ('microseconds', 'microsecond'):
-                self._date = self._date.replace(microsecond=value)
-            elif unit == 'weekday':
-                self._weekday(value)
+        fields = {}
+        for unit, value in kwargs.items():
+            field = REPLACE_FIELDS.get(UNIT_ALIASES.get(unit))
+            if field is not None:
+                fields[field] = value
+        if fields:
+            self._date = self._date.replace(**fields)
+        if 'weekday' in kwargs:
+            self._weekday(kwargs['weekday'])
 
         return self
 
+    def add_business_days(self, days, calendar=None):
+        """
+        Move by a number of business days, Monday to Friday unless a
+        `BusinessCalendar` is given.
+        """
+        self._date = (calendar or WEEKDAYS).add_business_days(self._date, days)
+        return self
+
+    def is_business_day(self, calendar=None):
+        """Whether the date is a business day."""
+        return (calendar or WEEKDAYS).is_business_day(self._date)
+
+    def business_days_between(self, other, calendar=None):
+        """Business days from this date up to, but not including, `other`."""
+        if isinstance(other, MutableDate):
+            other = other.date
+        return (calendar or WEEKDAYS).business_days_between(self._date, other)
+
     def epoch(self, rounding=True, milliseconds=False):
         """Milliseconds since epoch."""
         zero = datetime.utcfromtimestamp(0)
@@ -246,7 +411,7 @@ class MutableDate(object):
     def __sub__(self, other):
         if isinstance(other, datetime):
             return self._date - other
-        elif isinstance(other, type(self)):
+        elif isinstance(other, MutableDate):
             return self._date - other.date
 
     def __rsub__(self, other):
@@ -255,35 +420,35 @@ class MutableDate(object):
     def __lt__(self, other):
         if isinstance(other, datetime):
             return self._date < other
-        elif isinstance(other, type(self)):
+        elif isinstance(other, MutableDate):
             return self._date < other.date
 
     def __le__(self, other):
         if isinstance(other, datetime):
             return self._date <= other
-        elif isinstance(other, type(self)):
+        elif isinstance(other, MutableDate):
             return self._date <= other.date
 
     def __eq__(self, other):
         if isinstance(other, datetime):
             return self._date == other
-        elif isinstance(other, type(self)):
+        elif isinstance(other, MutableDate):
             return self._date == other.date
 
     def __ne__(self, other):
         if isinstance(other, datetime):
             return self._date != other
-        elif isinstance(other, type(self)):
+        elif isinstance(other, MutableDate):
             return self._date != other.date
 
     def __gt__(self, other):
         if isinstance(other, datetime):
             return self._date > other
-        elif isinstance(other, type(self)):
+        elif isinstance(other, MutableDate):
             return self._date > other.date
 
     def __ge__(self, other):
         if isinstance(other, datetime):
             return self._date >= other
-        elif isinstance(other, type(self)):
+        elif isinstance(other, MutableDate):
             return self._date >= other.date
@@ -0,0 +1,143 @@
+"""
+Render compiled format plans straight from a datetime's fields, without
+going through strftime.
+"""
+
+from .months import day_of_year
+
+TOKEN = 'token'
+LITERAL = 'literal'
+
+PADDED = tuple('%02d' % number for number in range(100))
+
+MONTH_NAMES = (None, 'January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December')
+MONTH_ABBREVIATIONS = (None,) + tuple(name[:3] for name in MONTH_NAMES[1:])
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
+                 'Saturday', 'Sunday')
+WEEKDAY_ABBREVIATIONS = tuple(name[:3] for name in WEEKDAY_NAMES)
+
+# Hours on a 12-hour clock, indexed by the 24-hour value.
+TWELVE_HOURS = (12,) + tuple(range(1, 13)) + tuple(range(1, 12))
+MERIDIEMS = ('AM', 'PM')
+LOWER_MERIDIEMS = ('am', 'pm')
+
+
+# Each token renders as a %-format spec applied to a Python expression of
+# the datetime `d`. Lookup tables replace the padding work strftime does.
+RENDERERS = {
+    'YYYY': ('%04d', 'd.year'),
+    'YY': ('%s', 'PADDED[d.year % 100]'),
+    'MMMM': ('%s', 'MONTH_NAMES[d.month]'),
+    'MMM': ('%s', 'MONTH_ABBREVIATIONS[d.month]'),
+    'MM': ('%s', 'PADDED[d.month]'),
+    'M': ('%d', 'd.month'),
+    'DDDD': ('%03d', 'day_of_year(d)'),
+    'DDD': ('%d', 'day_of_year(d)'),
+    'DD': ('%s', 'PADDED[d.day]'),
+    'D': ('%d', 'd.day'),
+    'dddd': ('%s', 'WEEKDAY_NAMES[d.weekday()]'),
+    'ddd': ('%s', 'WEEKDAY_ABBREVIATIONS[d.weekday()]'),
+    'dd': ('%d', 'd.isoweekday() % 7'),
+    'd': ('%d', 'd.isoweekday()'),
+    'HH': ('%s', 'PADDED[d.hour]'),
+    'H': ('%d', 'd.hour'),
+    'hh': ('%s', 'PADDED[TWELVE_HOURS[d.hour]]'),
+    'h': ('%d', 'TWELVE_HOURS[d.hour]'),
+    'mm': ('%s', 'PADDED[d.minute]'),
+    'm': ('%d', 'd.minute'),
+    'ss': ('%s', 'PADDED[d.second]'),
+    's': ('%d', 'd.second'),
+    'SSS': ('%03d', 'd.microsecond // 1000'),
+    'A': ('%s', 'MERIDIEMS[d.hour >= 12]'),
+    'a': ('%s', 'LOWER_MERIDIEMS[d.hour >= 12]'),
+    'ZZ': ('%s', "utc_offset(d, '')"),
+    'Z': ('%s', "utc_offset(d, ':')"),
+}
+
+
+def utc_offset(date, separator):
+    """Render a UTC offset as +hh:mm (or +hhmm); empty for naive dates."""
+    delta = date.utcoffset()
+    if delta is None:
+        return ''
+    minutes = (delta.days * 86400 + delta.seconds) // 60
+    hours, minutes = divmod(abs(minutes), 60)
+    return '%s%02d%s%02d' % ('-' if delta.days < 0 else '+', hours, separator, minutes)
+
+
+def compile_renderer(tokens):
+    """
+    Turn a tokenized format into a function that renders a datetime. The
+    whole pattern becomes a single %-interpolation over the datetime's
+    fields, generated once per pattern.
+    """
+    template = []
+    expressions = []
+    for kind, text in tokens:
+        if kind == TOKEN:
+            spec, expression = RENDERERS[text]
+            template.append(spec)
+            expressions.append(expression)
+        else:
+            template.append(text.replace('%', '%%'))
+    namespace = dict(globals(), TEMPLATE=''.join(template))
+    arguments = ''.join(expression + ', ' for expression in expressions)
+    source = 'def render(d):\n    return TEMPLATE %% (%s)\n' % arguments
+    exec(source, namespace)
+    return namespace['render']
+
+
+# Tokens that depend only on the calendar day, so their rendering can be
+# shared by every datetime on the same day.
+DAY_TOKENS = frozenset(('YYYY', 'YY', 'MMMM', 'MMM', 'MM', 'M', 'DDDD', 'DDD',
+                        'DD', 'D', 'dddd', 'ddd', 'dd', 'd'))
+
+
+def compile_day_renderer(tokens):
+    """
+    Split a tokenized format into a pair of functions: `render_day(d)`,
+    which renders each run of day-only tokens (with the literals inside
+    it) into a tuple of strings, and `render(d, day)`, which renders the
+    rest and splices the day's strings back in. Callers cache the result
+    of `render_day` while consecutive datetimes fall on the same day.
+    """
+    runs = []
+    template = []
+    expressions = []
+    pending = []
+    for kind, text in tokens:
+        if kind == TOKEN and text not in DAY_TOKENS:
+            _close_run(runs, pending, template, expressions)
+            spec, expression = RENDERERS[text]
+            template.append(spec)
+            expressions.append(expression)
+        elif kind == TOKEN or pending:
+            pending.append((kind, text))
+        else:
+            template.append(text.replace('%', '%%'))
+    _close_run(runs, pending, template, expressions)
+
+    namespace = dict(globals(), TEMPLATE=''.join(template),
+                     RUNS=tuple(compile_renderer(run) for run in runs))
+    lines = ['def render_day(d):',
+             '    return (%s)' % ''.join('RUNS[%d](d), ' % index
+                                         for index in range(len(runs))),
+             'def render(d, day):',
+             '    return TEMPLATE %% (%s)' % ''.join(expression + ', '
+                                                  for expression in expressions)]
+    exec('\n'.join(lines) + '\n', namespace)
+    return namespace['render_day'], namespace['render']
+
+
+def _close_run(runs, pending, template, expressions):
+    """Turn the pending day-only tokens into one run, minus trailing literals."""
+    trailing = []
+    while pending and pending[-1][0] != TOKEN:
+        trailing.insert(0, pending.pop())
+    if pending:
+        template.append('%s')
+        expressions.append('day[%d]' % len(runs))
+        runs.append(tuple(pending))
+        del pending[:]
+    template.extend(text.replace('%', '%%') for kind, text in trailing)
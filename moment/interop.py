@@ -0,0 +1,130 @@
+"""
+Convert sequences of moments and epochs to and from columnar arrays: NumPy
+`datetime64[us]` buffers and Arrow `timestamp[us, tz]` arrays. Columns that
+are already microsecond timestamps are reinterpreted in place rather than
+copied, so crossing the boundary doesn't build a Python object per row.
+NumPy is required and Arrow is imported on first use; neither is imported
+by `import moment`.
+"""
+
+import numpy as np
+
+from .core import EpochMoment
+from .date import EPOCH_UNITS, MutableDate, epoch_microseconds, epoch_scale
+from .vector import MomentArray
+
+
+NAT = np.iinfo('i8').min
+
+
+def to_datetime64(values, unit=None):
+    """
+    Return a naive UTC `datetime64[us]` array for a MomentArray, a NumPy
+    datetime64 or integer array, or any sequence of moments and datetimes.
+    Integer arrays are epochs in `unit` ('s', 'ms', 'us' or 'ns'). Input
+    that is already in microseconds is returned as a view, not a copy.
+    """
+    if isinstance(values, MomentArray):
+        return values.values
+    if _is_arrow(values):
+        return from_arrow(values)
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == 'M':
+            return values.astype('M8[us]', copy=False)
+        if values.dtype.kind in 'iu':
+            if unit is None:
+                raise ValueError("integer epochs need a unit")
+            scale = epoch_scale(unit)
+            if scale != EPOCH_UNITS['us']:
+                values = values.astype('i8') * scale // 1000
+            return values.astype('i8', copy=False).view('M8[us]')
+    if unit is not None:
+        return to_datetime64(np.asarray(values, dtype='i8'), unit)
+    microseconds = np.fromiter((_microseconds(value) for value in values), dtype='i8')
+    return microseconds.view('M8[us]')
+
+
+def to_epochs(values, unit='us'):
+    """Integer epochs in `unit` as an int64 array; a view for microseconds."""
+    microseconds = to_datetime64(values).view('i8')
+    scale = epoch_scale(unit)
+    if scale == EPOCH_UNITS['us']:
+        return microseconds
+    return microseconds * 1000 // scale
+
+
+def to_moments(values, tz=None):
+    """
+    Materialize a column as a list of EpochMoments, in zone `tz` when given
+    (Arrow arrays default to the zone of their type). Missing values become
+    None.
+    """
+    if tz is None and _is_arrow(values):
+        tz = values.type.tz
+    from_microseconds = EpochMoment.from_microseconds
+    return [None if microseconds == NAT else from_microseconds(microseconds, tz)
+            for microseconds in to_epochs(values).tolist()]
+
+
+def to_arrow(values, tz=None, unit=None):
+    """
+    Return an Arrow `timestamp[us, tz]` array for anything `to_datetime64`
+    accepts. The Arrow array uses the NumPy buffer directly, and NaT values
+    become nulls.
+    """
+    import pyarrow as pa
+    microseconds = np.ascontiguousarray(to_datetime64(values, unit).view('i8'))
+    missing = microseconds == NAT
+    validity = None
+    if missing.any():
+        validity = pa.py_buffer(_pack_validity(~missing))
+    return pa.Array.from_buffers(pa.timestamp('us', tz=tz), len(microseconds),
+                                 [validity, pa.py_buffer(microseconds)],
+                                 null_count=int(missing.sum()))
+
+
+def from_arrow(array):
+    """
+    Return the naive UTC `datetime64[us]` values of an Arrow timestamp
+    array (or single-chunk ChunkedArray). Microsecond arrays without nulls
+    are viewed in place; nulls become NaT.
+    """
+    import pyarrow as pa
+    if isinstance(array, pa.ChunkedArray):
+        if array.num_chunks != 1:
+            return np.concatenate([from_arrow(chunk) for chunk in array.chunks])
+        array = array.chunk(0)
+    if not pa.types.is_timestamp(array.type):
+        raise TypeError("expected an Arrow timestamp array, got %s" % (array.type,))
+    if array.type.unit != 'us':
+        array = array.cast(pa.timestamp('us', tz=array.type.tz))
+    validity, data = array.buffers()
+    values = np.frombuffer(data, dtype='i8', count=len(array), offset=array.offset * 8)
+    if array.null_count:
+        bits = np.unpackbits(np.frombuffer(validity, dtype='u1'))
+        bits = bits.reshape(-1, 8)[:, ::-1].ravel()
+        valid = bits[array.offset:array.offset + len(array)].astype(bool)
+        values = np.where(valid, values, NAT)
+    return values.view('M8[us]')
+
+
+def _pack_validity(valid):
+    """Pack a boolean mask into Arrow's least-significant-bit-first bitmap."""
+    padded = np.zeros(-(-len(valid) // 8) * 8, dtype='u1')
+    padded[:len(valid)] = valid
+    return np.packbits(padded.reshape(-1, 8)[:, ::-1]).tobytes()
+
+
+def _microseconds(value):
+    if isinstance(value, EpochMoment):
+        return value._microseconds
+    if isinstance(value, MutableDate):
+        value = value.date
+    if value is None:
+        return NAT
+    return epoch_microseconds(value)
+
+
+def _is_arrow(values):
+    module = type(values).__module__
+    return module.startswith('pyarrow')
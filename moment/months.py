@@ -0,0 +1,77 @@
+"""
+Calendar arithmetic on proleptic Gregorian ordinals. Month lengths and the
+number of days before each month are precomputed for common and leap
+years, so shifting a date by months is a few table lookups and a single
+timedelta addition.
+"""
+
+from datetime import timedelta
+
+
+# Indexed by [is_leap][month]; month 0 is padding.
+DAYS_IN_MONTH = (
+    (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31),
+    (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31),
+)
+DAYS_BEFORE_MONTH = tuple(
+    tuple(sum(lengths[1:month]) for month in range(13)) for lengths in DAYS_IN_MONTH
+)
+
+
+def is_leap(year):
+    """Whether `year` is a leap year in the proleptic Gregorian calendar."""
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def days_in_month(year, month):
+    """Number of days in the given month."""
+    return DAYS_IN_MONTH[is_leap(year)][month]
+
+
+def days_before_year(year):
+    """Number of days before January 1st of `year`."""
+    year -= 1
+    return year * 365 + year // 4 - year // 100 + year // 400
+
+
+def ordinal(year, month, day):
+    """Proleptic Gregorian ordinal, where 0001-01-01 is day 1."""
+    return days_before_year(year) + DAYS_BEFORE_MONTH[is_leap(year)][month] + day
+
+
+def day_of_year(date):
+    """Day of the year, starting at 1 for January 1st."""
+    return DAYS_BEFORE_MONTH[is_leap(date.year)][date.month] + date.day
+
+
+def shift_months(date, months):
+    """Shift a date or datetime by a number of months, clamping the day."""
+    target = _shifted_ordinal(date.year, date.month, date.day, months)
+    return date + timedelta(days=target - date.toordinal())
+
+
+def shift_months_many(dates, months):
+    """
+    Shift every date in a sequence by the same number of months. Dates that
+    fall on the same day share the computed offset.
+    """
+    deltas = {}
+    shifted = []
+    for date in dates:
+        source = date.toordinal()
+        delta = deltas.get(source)
+        if delta is None:
+            target = _shifted_ordinal(date.year, date.month, date.day, months)
+            delta = deltas[source] = timedelta(days=target - source)
+        shifted.append(date + delta)
+    return shifted
+
+
+def _shifted_ordinal(year, month, day, months):
+    year, month = divmod(year * 12 + month - 1 + months, 12)
+    month += 1
+    if not 1 <= year <= 9999:
+        raise ValueError("year %d is out of range" % year)
+    leap = is_leap(year)
+    return (days_before_year(year) + DAYS_BEFORE_MONTH[leap][month]
+            + min(day, DAYS_IN_MONTH[leap][month]))
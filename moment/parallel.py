@@ -0,0 +1,171 @@
+"""
+Parse and format large batches on a pool of worker processes. The input
+is split into ordered chunks. Chunks of datetimes cross the process
+boundary as an int64 array of wall-clock microseconds, plus a table of
+their tzinfos, and are rebuilt lazily as the consumer iterates; epochs
+travel as an int64 array as they are, and anything else is pickled as a
+list. Batches smaller than `MIN_ITEMS` are handled in-process, where pool
+startup and IPC would cost more than they save.
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+
+from .date import EPOCH, MutableDate
+from .parse import format_many, parse_many, write_lines
+
+
+MIN_ITEMS = 20000
+
+# Chunks per worker: enough to even out uneven chunks, few enough that
+# per-chunk overhead stays small.
+CHUNKS_PER_WORKER = 4
+
+# Python 2's array has no 'q'; 'l' is 64 bits wide on LP64 platforms. Where
+# neither is, chunks are pickled as lists.
+try:
+    INT64 = array('q').typecode
+except ValueError:
+    INT64 = 'l' if array('l').itemsize == 8 else None
+
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+
+def parallel_parse_many(strings, formula=None, tz=None, unit=None, errors=None,
+                        workers=None):
+    """
+    `parse_many` spread across `workers` processes, yielding results in
+    input order. Errors are collected into `errors` with their index in
+    the whole input, or re-raised from the worker.
+    """
+    strings = list(strings)
+    if not workers or workers < 2 or len(strings) < MIN_ITEMS:
+        return parse_many(strings, formula, tz, unit, errors)
+    tasks = [(chunk, formula, tz, unit, errors is not None)
+             for chunk in _chunks(strings, workers)]
+    return _parse_results(_run(_parse_chunk, tasks, workers), errors)
+
+
+def parallel_format_many(values, pattern, tz=None, stream=None, unit='auto',
+                         workers=None):
+    """`format_many` spread across `workers` processes, in input order."""
+    values = list(values)
+    if not workers or workers < 2 or len(values) < MIN_ITEMS:
+        return format_many(values, pattern, tz, stream, unit)
+    tasks = [(_pack(chunk), pattern, tz, unit) for chunk in _chunks(values, workers)]
+    lines = _flatten(_run(_format_chunk, tasks, workers))
+    if stream is None:
+        return lines
+    return write_lines(lines, stream)
+
+
+def _chunks(values, workers):
+    size = -(-len(values) // (workers * CHUNKS_PER_WORKER))
+    offsets = range(0, len(values), size)
+    return [values[offset:offset + size] for offset in offsets]
+
+
+def _run(function, tasks, workers):
+    """Yield each task's result in order, closing the pool when done."""
+    pool = Pool(workers)
+    try:
+        for result in pool.imap(function, tasks):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _parse_results(results, errors):
+    offset = 0
+    for count, values, failures in results:
+        if errors is not None:
+            errors.extend((offset + index, string, error)
+                          for index, string, error in failures)
+        for value in _unpack(values):
+            yield value
+        offset += count
+
+
+def _flatten(results):
+    for values in results:
+        for value in values:
+            yield value
+
+
+def _parse_chunk(task):
+    """Parse one chunk, returning its length, its packed values and errors."""
+    strings, formula, tz, unit, collect = task
+    failures = [] if collect else None
+    values = list(parse_many(strings, formula, tz, unit, failures))
+    packed = _pack_epochs(values) if unit is not None else _pack(values)
+    return len(values), packed, failures or []
+
+
+def _pack(chunk):
+    """
+    Pack a chunk of datetimes (or None) as their wall-clock microseconds
+    and zone numbers into a table of tzinfos, which rebuilds each one with
+    its own tzinfo object. Other chunks, such as dates, epochs, datetime
+    subclasses or times with `fold` set, are returned as a list.
+    """
+    if INT64 is None:
+        return chunk
+    walls, numbers, zones = array(INT64), array('i'), {}
+    try:
+        for value in chunk:
+            if value is None:
+                walls.append(0)
+                numbers.append(-1)
+                continue
+            if type(value) is not datetime:
+                if not isinstance(value, MutableDate):
+                    return chunk
+                value = value.date
+                if type(value) is not datetime:
+                    return chunk
+            if getattr(value, 'fold', 0):
+                return chunk
+            walls.append((value.toordinal() - _EPOCH_ORDINAL) * 86400000000
+                         + (value.hour * 3600 + value.minute * 60 + value.second) * 1000000
+                         + value.microsecond)
+            tz = value.tzinfo
+            number = zones.get(tz)
+            if number is None:
+                number = zones[tz] = len(zones)
+            numbers.append(number)
+    except (TypeError, OverflowError):
+        # Unhashable tzinfos, or dates beyond an int64 of microseconds.
+        return chunk
+    return walls, numbers, sorted(zones, key=zones.get)
+
+
+def _pack_epochs(chunk):
+    """Integer epochs as an int64 array, or the list when any don't fit."""
+    if INT64 is None:
+        return chunk
+    try:
+        return array(INT64, chunk)
+    except (TypeError, OverflowError):
+        return chunk
+
+
+def _unpack(values):
+    """Iterate a packed chunk, rebuilding datetimes as they are reached."""
+    if not isinstance(values, tuple):
+        return values
+    return _rebuild(*values)
+
+
+def _rebuild(walls, numbers, zones):
+    # Adding to an aware epoch keeps its tzinfo, so each value is one add.
+    epochs = [EPOCH.replace(tzinfo=tz) for tz in zones]
+    for wall, number in zip(walls, numbers):
+        yield None if number < 0 else epochs[number] + timedelta(0, 0, wall)
+
+
+def _format_chunk(task):
+    values, pattern, tz, unit = task
+    return list(format_many(_unpack(values), pattern, tz, unit=unit))
@@ -1,25 +1,298 @@
+import re
+from collections import namedtuple
 from datetime import datetime
+from itertools import islice
+from numbers import Number
+
+from .date import EPOCH_UNITS, MutableDate, from_epoch, to_epoch
+from .formatter import LITERAL, TOKEN, compile_day_renderer, compile_renderer
+from .scanner import compile_parser
+from .utils import LRUCache, string_types
+from .zones import fixed_offset, get_zone, localize, to_zone
+
+
+# Moment.js tokens and their strftime equivalents.
+STRFTIME_TOKENS = {
+    'A': '%p',
+    'a': '%P',
+    'HH': '%H',
+    'H': '%k',
+    'hh': '%I',
+    'h': '%l',
+    'mm': '%M',
+    'm': '%M',
+    'ss': '%S',
+    's': '%S',
+    'SSS': '%f',
+    'YYYY': '%Y',
+    'YY': '%y',
+    'MMMM': '%B',
+    'MMM': '%b',
+    'MM': '%m',
+    'M': '%m',
+    'dddd': '%A',
+    'ddd': '%a',
+    'dd': '%w',
+    'd': '%u',
+    'DDDD': '%j',
+    'DDD': '%j',
+    'DD': '%d',
+    'D': '%d',
+    'ZZ': '%z',
+    'Z': '%z',
+}
+
+_TOKEN_LENGTHS = sorted(set(len(token) for token in STRFTIME_TOKENS), reverse=True)
+
+FormatPlan = namedtuple('FormatPlan', 'pattern tokens strftime render parse')
+
+_FORMAT_CACHE = LRUCache(maxsize=256)
+_DAY_RENDERERS = LRUCache(maxsize=256)
+
+# strftime directives that always match a fixed number of digits when they
+# lead a format, and the clock formats that can follow them.
+_DATE_DIRECTIVES = {'%Y': r'\d{4}', '%m': r'\d{2}', '%d': r'\d{2}'}
+_CLOCK_FORMATS = (('%H:%M:%S', r'(\d\d):(\d\d):(\d\d)\Z'),
+                  ('%H:%M', r'(\d\d):(\d\d)()\Z'))
+
+# A date at the start of an ISO string, followed by its clock separator.
+_ISO_PREFIX = re.compile(r'\d{4}-\d{2}-\d{2}[Tt ]|\d{8}[Tt ]')
+
+# Off until `enable_parse_cache` is called.
+_PARSE_CACHE = None
 
 
 def parse_date_and_formula(*args):
     """Doesn't need to be part of core Moment class."""
     date, formula = _parse_arguments(*args)
     if date and formula:
-        if '%' not in formula:
-            formula = parse_js_date(formula)
-        date = datetime.strptime(date, formula)
+        plan = None if '%' in formula else compile_format(formula)
+        if _PARSE_CACHE is not None:
+            date = _PARSE_CACHE.parser(formula)(date)
+        elif plan is None:
+            date = datetime.strptime(date, formula)
+        else:
+            date = plan.parse(date)
+        if plan is not None:
+            formula = plan.strftime
     elif isinstance(date, list) or isinstance(date, tuple):
         if len(date) == 1:
             # Python datetime needs the month and day, too.
             date = [date[0], 1, 1]
         date = datetime(*date)
-    elif isinstance(date, str) or isinstance(date, unicode):
-        if formula is None:
-            formula = "%Y-%m-%d"
-        date = datetime.strptime(date, formula)
+    elif isinstance(date, string_types):
+        if _PARSE_CACHE is None:
+            date = parse_default(date)
+        else:
+            date = _PARSE_CACHE.parser()(date)
+        formula = "%Y-%m-%d"
     return date, formula
 
 
+def parse_many(strings, formula=None, tz=None, unit=None, errors=None):
+    """
+    Lazily parse an iterable of strings that share one formula, which is
+    resolved only once. Yields datetimes, localized to (or converted into)
+    `tz` when given, or integer epochs when `unit` is one of 's', 'ms', 'us'
+    or 'ns'. Pass a list as `errors` to collect `(index, string, error)`
+    tuples and yield None for bad rows instead of raising.
+    """
+    if unit is not None and unit not in EPOCH_UNITS:
+        raise ValueError("unknown epoch unit %r" % (unit,))
+    parse = get_parser(formula, tz)
+    for index, string in enumerate(strings):
+        try:
+            date = parse(string)
+        except (TypeError, ValueError) as error:
+            if errors is None:
+                raise
+            errors.append((index, string, error))
+            yield None
+            continue
+        if unit is not None:
+            date = to_epoch(date, unit)
+        yield date
+
+
+def get_parser(formula=None, tz=None):
+    """
+    Return a function that turns a string into a datetime using `formula`,
+    which may be a Moment.js or strftime format. Without a formula, strings
+    are parsed as ISO 8601. Results are localized to (or converted into)
+    `tz` when given, and memoized when the parse cache is enabled.
+    """
+    if _PARSE_CACHE is not None:
+        return _PARSE_CACHE.parser(formula, tz)
+    return _build_parser(formula, tz)
+
+
+def _build_parser(formula=None, tz=None, cache=None):
+    if formula is None:
+        parse = parse_default
+    elif '%' in formula:
+        parse = lambda string, formula=formula: datetime.strptime(string, formula)
+    else:
+        plan = compile_format(formula)
+        parse, formula = plan.parse, plan.strftime
+    if cache is not None:
+        parse = _prefix_parser(parse, formula, cache)
+    if tz:
+        parse = _localizer(parse, tz)
+    return parse
+
+
+def _localizer(parse, name):
+    def parse_in_zone(string):
+        date = parse(string)
+        if date.tzinfo is None:
+            return localize(date, name)
+        return to_zone(date, name)
+    return parse_in_zone
+
+
+def _prefix_parser(parse, formula, cache):
+    """
+    Wrap `parse` so that a string starting with the same date as the last
+    one only has its clock parsed. Applies to ISO strings and to formats
+    made of a fixed-width date, one separator and `_CLOCK_FORMATS`. A
+    clock the fast path can't read is left to `parse`, so errors are the
+    same as without the cache.
+    """
+    if formula is None:
+        prefix, parse_clock = _ISO_PREFIX, _parse_clock
+    else:
+        layout = _clock_layout(formula)
+        if layout is None:
+            return parse
+        prefix, parse_clock = layout
+    last = [None]
+
+    def parse_with_prefix(string):
+        seen = last[0]
+        if seen is not None and string.startswith(seen[0]):
+            try:
+                date = parse_clock(seen[1], seen[2], seen[3], string[len(seen[0]):])
+            except (ValueError, IndexError):
+                pass
+            else:
+                cache.prefix_hits += 1
+                return date
+        date = parse(string)
+        match = prefix.match(string)
+        if match is not None:
+            last[0] = (match.group(), date.year, date.month, date.day)
+        return date
+    return parse_with_prefix
+
+
+def _clock_layout(formula):
+    """
+    Split a strftime format such as '%Y-%m-%d %H:%M:%S' into a regex for its
+    date prefix and a function that strictly parses the clock after it, or
+    return None when the format doesn't have that shape.
+    """
+    for clock, clock_pattern in _CLOCK_FORMATS:
+        date = formula[:-len(clock)]
+        if not formula.endswith(clock) or date.endswith('%'):
+            continue
+        pattern = []
+        for part in re.split('(%.)', date):
+            if part.startswith('%'):
+                if part not in _DATE_DIRECTIVES:
+                    return None
+                pattern.append(_DATE_DIRECTIVES[part])
+            else:
+                pattern.append(re.escape(part))
+        return re.compile(''.join(pattern)), _strict_clock(re.compile(clock_pattern))
+    return None
+
+
+def _strict_clock(pattern):
+    """Parse exactly two-digit hours, minutes and seconds, and nothing else."""
+    match = pattern.match
+
+    def parse_clock(year, month, day, clock):
+        fields = match(clock)
+        if fields is None:
+            raise ValueError
+        hour, minute, second = fields.groups()
+        return datetime(year, month, day, int(hour), int(minute), int(second or 0))
+    return parse_clock
+
+
+class ParseCache(LRUCache):
+    """
+    Parsed datetimes keyed by `(string, formula, tz)`, for input such as
+    logs where the same timestamp repeats in bursts. Each parser it hands
+    out also remembers the date of the last string it parsed, so a string
+    sharing that date prefix only has its clock parsed.
+    """
+
+    def __init__(self, maxsize=4096):
+        super(ParseCache, self).__init__(maxsize)
+        self.prefix_hits = 0
+        self._parsers = {}
+
+    def parser(self, formula=None, tz=None):
+        """Return the shared memoizing parser for a formula and zone."""
+        key = (formula, tz)
+        parse = self._parsers.get(key)
+        if parse is None:
+            parse = self._memoize(_build_parser(formula, tz, self), formula, tz)
+            self._parsers[key] = parse
+        return parse
+
+    def _memoize(self, parse, formula, tz):
+        get, put = self.get, self.put
+
+        def parse_cached(string):
+            key = (string, formula, tz)
+            date = get(key)
+            if date is None:
+                date = parse(string)
+                put(key, date)
+            return date
+        return parse_cached
+
+    def clear(self):
+        super(ParseCache, self).clear()
+        self.prefix_hits = 0
+        self._parsers = {}
+
+    def info(self):
+        info = super(ParseCache, self).info()
+        info['prefix_hits'] = self.prefix_hits
+        return info
+
+
+def enable_parse_cache(maxsize=4096):
+    """
+    Start memoizing parsed strings, keeping at most `maxsize` of them.
+    Worth it for repetitive input; a cache that never hits only adds cost.
+    """
+    global _PARSE_CACHE
+    _PARSE_CACHE = ParseCache(maxsize)
+
+
+def disable_parse_cache():
+    """Stop memoizing parsed strings and drop the cache."""
+    global _PARSE_CACHE
+    _PARSE_CACHE = None
+
+
+def parse_cache_info():
+    """Hits, misses, prefix hits and size of the parse cache, or None if off."""
+    cache = _PARSE_CACHE
+    return cache.info() if cache is not None else None
+
+
+def clear_parse_cache():
+    """Empty the parse cache, if enabled, and reset its counters."""
+    cache = _PARSE_CACHE
+    if cache is not None:
+        cache.clear()
+
+
 def _parse_arguments(*args):
     """Because I'm not particularly Pythonic."""
     formula = None
@@ -33,74 +306,216 @@ def _parse_arguments(*args):
     return date, formula
 
 
+def parse_iso(string):
+    """
+    Parse an ISO 8601 / RFC 3339 date or datetime by hand, which is a lot
+    faster than strptime. Both the extended (2012-12-18T10:30:00) and basic
+    (20121218T103000) forms are accepted, with optional fractional seconds
+    and a `Z` or `+hh:mm` offset. Offsets produce tz-aware datetimes.
+    """
+    try:
+        return _parse_iso(string)
+    except (ValueError, IndexError):
+        raise ValueError("time data %r is not in ISO 8601 format" % (string,))
+
+
+def parse_default(string):
+    """
+    Parse a string given without a format: ISO 8601 first, then anything
+    strptime's '%Y-%m-%d' accepts, such as unpadded '2012-1-5'. Errors
+    come from strptime, as they did before ISO parsing was added.
+    """
+    try:
+        return _parse_iso(string)
+    except (ValueError, IndexError):
+        pass
+    return datetime.strptime(string, '%Y-%m-%d')
+
+
+def _parse_iso(string):
+    length = len(string)
+    if length >= 10 and string[4] == '-' and string[7] == '-':
+        digits = string[0:4] + string[5:7] + string[8:10]
+        position = 10
+    else:
+        digits = string[0:8]
+        position = 8
+    if len(digits) != 8 or not digits.isdigit():
+        raise ValueError
+    year, month, day = int(digits[0:4]), int(digits[4:6]), int(digits[6:8])
+    if position == length:
+        return datetime(year, month, day)
+    if string[position] not in 'Tt ':
+        raise ValueError
+    return _parse_clock(year, month, day, string[position + 1:])
+
+
+def _parse_clock(year, month, day, clock):
+    """Parse the time and offset that follow the date in an ISO string."""
+    tzinfo = None
+    if clock[-1:] in ('Z', 'z'):
+        tzinfo = get_zone('UTC')
+        clock = clock[:-1]
+    else:
+        sign = max(clock.rfind('+'), clock.rfind('-'))
+        if sign != -1:
+            tzinfo = _parse_offset(clock[sign:])
+            clock = clock[:sign]
+
+    microsecond = 0
+    if clock[8:9] in ('.', ',') or clock[6:7] in ('.', ','):
+        clock, fraction = clock.replace(',', '.').split('.')
+        if not fraction.isdigit():
+            raise ValueError
+        microsecond = int((fraction[:6] + '00000')[:6])
+
+    if ':' in clock:
+        if clock[2:3] != ':' or len(clock) not in (5, 8) or clock[5:6] not in ('', ':'):
+            raise ValueError
+        clock = clock.replace(':', '')
+    if len(clock) not in (2, 4, 6) or not clock.isdigit():
+        raise ValueError
+    return datetime(year, month, day, int(clock[0:2]), int(clock[2:4] or 0),
+                    int(clock[4:6] or 0), microsecond, tzinfo)
+
+
+def _parse_offset(offset):
+    """Turn `+hh`, `+hhmm` or `+hh:mm` into a fixed-offset tzinfo."""
+    digits = offset[1:].replace(':', '')
+    if len(digits) not in (2, 4) or not digits.isdigit():
+        raise ValueError
+    minutes = int(digits[0:2]) * 60 + int(digits[2:4] or 0)
+    return fixed_offset(-minutes if offset[0] == '-' else minutes)
+
+
 def parse_js_date(date):
     """
     Translate the easy-to-use JavaScript format strings to Python's cumbersome
-    strftime format. Also, this is some ugly code -- and it's completely
-    order-dependent.
-    """
-    # AM/PM
-    if 'A' in date:
-        date = date.replace('A', '%p')
-    elif 'a' in date:
-        date = date.replace('a', '%P')
-    # 24 hours
-    if 'HH' in date:
-        date = date.replace('HH', '%H')
-    elif 'H' in date:
-        date = date.replace('H', '%k')
-    # 12 hours
-    elif 'hh' in date:
-        date = date.replace('hh', '%I')
-    elif 'h' in date:
-        date = date.replace('h', '%l')
-    # Minutes
-    if 'mm' in date:
-        date = date.replace('mm', '%min')
-    elif 'm' in date:
-        date = date.replace('m', '%min')
-    # Seconds
-    if 'ss' in date:
-        date = date.replace('ss', '%S')
-    elif 's' in date:
-        date = date.replace('s', '%S')
-    # Milliseconds
-    if 'SSS' in date:
-        date = date.replace('SSS', '%3')
-    # Years
-    if 'YYYY' in date:
-        date = date.replace('YYYY', '%Y')
-    elif 'YY' in date:
-        date = date.replace('YY', '%y')
-    # Months
-    if 'MMMM' in date:
-        date = date.replace('MMMM', '%B')
-    elif 'MMM' in date:
-        date = date.replace('MMM', '%b')
-    elif 'MM' in date:
-        date = date.replace('MM', '%m')
-    elif 'M' in date:
-        date = date.replace('M', '%m')
-    # Days of the week
-    if 'dddd' in date:
-        date = date.replace('dddd', '%A')
-    elif 'ddd' in date:
-        date = date.replace('ddd', '%a')
-    elif 'dd' in date:
-        date = date.replace('dd', '%w')
-    elif 'd' in date:
-        date = date.replace('d', '%u')
-    # Days of the year
-    if 'DDDD' in date:
-        date = date.replace('DDDD', '%j')
-    elif 'DDD' in date:
-        date = date.replace('DDD', '%j')
-    # Days of the month
-    elif 'DD' in date:
-        date = date.replace('DD', '%d')
-    elif 'D' in date:
-        date = date.replace('D', '%d')
-    # A necessary evil right now...
-    if '%min' in date:
-        date = date.replace('%min', '%M')
-    return date
+    strftime format.
+    """
+    return compile_format(date).strftime
+
+
+def compile_format(pattern):
+    """
+    Compile a Moment.js format string into an immutable `FormatPlan`, which
+    carries the strftime translation, a direct renderer and a parser. Plans
+    are kept in a bounded LRU cache keyed by the pattern string.
+    """
+    plan = _FORMAT_CACHE.get(pattern)
+    if plan is None:
+        tokens = tokenize(pattern)
+        strftime = ''.join(
+            STRFTIME_TOKENS[text] if kind == TOKEN else text.replace('%', '%%')
+            for kind, text in tokens
+        )
+        plan = FormatPlan(pattern, tokens, strftime, compile_renderer(tokens),
+                          compile_parser(pattern, tokens))
+        _FORMAT_CACHE.put(pattern, plan)
+    return plan
+
+
+def format_many(values, pattern, tz=None, stream=None, unit='auto'):
+    """
+    Format moments, datetimes or epochs in `unit` with one pattern,
+    converted into zone `tz` when given (naive datetimes and epochs are
+    taken to be UTC). The day part of the pattern is rendered once per run
+    of values on the same day. Returns a lazy iterator of strings, or
+    writes them as lines to `stream` and returns how many were written.
+    None values format as empty strings.
+    """
+    lines = _format_lines(values, pattern, tz, unit)
+    if stream is None:
+        return lines
+    return write_lines(lines, stream)
+
+
+def write_lines(lines, stream, batch=4096):
+    """Write strings to a text stream as lines, a batch at a time."""
+    count = 0
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, batch))
+        if not chunk:
+            return count
+        stream.write('\n'.join(chunk) + '\n')
+        count += len(chunk)
+
+
+def _format_lines(values, pattern, tz, unit):
+    render_day, render = _day_renderer(pattern)
+    last = day = None
+    for value in values:
+        if type(value) is not datetime:
+            if value is None:
+                yield ''
+                continue
+            value = _as_datetime(value, unit)
+        if tz is not None:
+            value = to_zone(value, tz)
+        ordinal = value.toordinal()
+        if ordinal != last:
+            day, last = render_day(value), ordinal
+        yield render(value, day)
+
+
+def _as_datetime(value, unit):
+    if isinstance(value, MutableDate):
+        return value.date
+    if isinstance(value, Number):
+        return from_epoch(value, unit)
+    return value
+
+
+def _day_renderer(pattern):
+    renderers = _DAY_RENDERERS.get(pattern)
+    if renderers is None:
+        renderers = compile_day_renderer(compile_format(pattern).tokens)
+        _DAY_RENDERERS.put(pattern, renderers)
+    return renderers
+
+
+def tokenize(pattern):
+    """
+    Split a Moment.js format string into a tuple of `(kind, text)` pairs,
+    where kind is either TOKEN or LITERAL. Text wrapped in square brackets
+    is always treated as a literal.
+    """
+    tokens = []
+    literal = []
+    index, length = 0, len(pattern)
+    while index < length:
+        char = pattern[index]
+        if char == '[':
+            end = pattern.find(']', index + 1)
+            if end != -1:
+                literal.append(pattern[index + 1:end])
+                index = end + 1
+                continue
+        for size in _TOKEN_LENGTHS:
+            text = pattern[index:index + size]
+            if len(text) == size and text in STRFTIME_TOKENS:
+                break
+        else:
+            literal.append(char)
+            index += 1
+            continue
+        if literal:
+            tokens.append((LITERAL, ''.join(literal)))
+            literal = []
+        tokens.append((TOKEN, text))
+        index += size
+    if literal:
+        tokens.append((LITERAL, ''.join(literal)))
+    return tuple(tokens)
+
+
+def format_cache_info():
+    """Hit/miss counters and size of the compiled format cache."""
+    return _FORMAT_CACHE.info()
+
+
+def clear_format_cache():
+    """Empty the compiled format cache and reset its counters."""
+    _FORMAT_CACHE.clear()
+    _DAY_RENDERERS.clear()
@@ -0,0 +1,141 @@
+"""
+Lazy ranges of dates.
+"""
+
+from datetime import datetime, timedelta
+from operator import gt, lt
+
+from .core import Moment
+from .date import (EPOCH_UNITS, MutableDate, epoch_microseconds, split_units,
+                   total_microseconds)
+from .months import shift_months
+
+
+def parse_step(step):
+    """
+    Turn a step such as '15 minutes', 'month', (2, 'weeks') or a timedelta
+    into a `(months, microseconds)` pair, exactly one of which is non-zero.
+    """
+    if isinstance(step, timedelta):
+        months, microseconds = 0, total_microseconds(step)
+    else:
+        if isinstance(step, tuple):
+            amount, unit = step
+        else:
+            parts = step.split()
+            amount, unit = (int(parts[0]), parts[1]) if len(parts) == 2 else (1, step)
+        months, microseconds = split_units(unit, amount)
+    if bool(months) == bool(microseconds):
+        raise ValueError("invalid step %r" % (step,))
+    return months, microseconds
+
+
+class Range(object):
+    """
+    Dates from `start` up to, but not including, `end`, `step` apart.
+    Nothing is materialized up front: the length, indexing and `index` are
+    computed arithmetically, and iterating does one addition per step.
+    Calendar steps (months, quarters, years) are counted from `start`, so
+    a range from January 31st visits the last day of every month.
+    """
+
+    def __init__(self, start, end, step='1 day', align=None, unit=None):
+        start, end = _datetime(start), _datetime(end)
+        if align is not None:
+            start = Moment(start).start_of(align).date
+        if unit is not None and unit not in EPOCH_UNITS:
+            raise ValueError("unknown epoch unit %r" % (unit,))
+        self.start = start
+        self.end = end
+        self.step = step
+        self.unit = unit
+        self._months, self._microseconds = parse_step(step)
+        self._before = lt if (self._months or self._microseconds) > 0 else gt
+
+    def __iter__(self):
+        end, before = self.end, self._before
+        if self._months:
+            index = 0
+            while True:
+                value = shift_months(self.start, index * self._months)
+                if not before(value, end):
+                    return
+                yield self._output(value)
+                index += 1
+        elif self.unit is None:
+            value, delta = self.start, timedelta(microseconds=self._microseconds)
+            while before(value, end):
+                yield value
+                value += delta
+        else:
+            scale = EPOCH_UNITS[self.unit]
+            value, step = epoch_microseconds(self.start), self._microseconds
+            end = epoch_microseconds(end)
+            while before(value, end):
+                yield value * 1000 // scale
+                value += step
+
+    def __len__(self):
+        if self._months:
+            months = ((self.end.year - self.start.year) * 12
+                      + self.end.month - self.start.month)
+            length = max(months // self._months + 1, 0)
+            while length and not self._before(self._value(length - 1), self.end):
+                length -= 1
+            while self._before(self._value(length), self.end):
+                length += 1
+            return length
+        span = total_microseconds(self.end - self.start)
+        return max(-(-span // self._microseconds), 0)
+
+    def __getitem__(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("range index out of range")
+        return self._output(self._value(index))
+
+    def __contains__(self, value):
+        try:
+            self.index(value)
+        except ValueError:
+            return False
+        return True
+
+    def index(self, value):
+        """Position of `value` in the range, found without iterating."""
+        value = _datetime(value)
+        if self._months:
+            months = ((value.year - self.start.year) * 12
+                      + value.month - self.start.month)
+            index, remainder = divmod(months, self._months)
+            found = not remainder and self._value(index) == value
+        else:
+            span = total_microseconds(value - self.start)
+            index, remainder = divmod(span, self._microseconds)
+            found = not remainder
+        if not found or not 0 <= index < len(self):
+            raise ValueError("%r is not in range" % (value,))
+        return index
+
+    def _value(self, index):
+        if self._months:
+            return shift_months(self.start, index * self._months)
+        return self.start + timedelta(microseconds=index * self._microseconds)
+
+    def _output(self, value):
+        if self.unit is None:
+            return value
+        return epoch_microseconds(value) * 1000 // EPOCH_UNITS[self.unit]
+
+    def __repr__(self):
+        return "<Range(%s, %s, %r)>" % (self.start, self.end, self.step)
+
+
+def _datetime(value):
+    if isinstance(value, MutableDate):
+        return value.date
+    if not isinstance(value, datetime):
+        raise TypeError("expected a datetime or moment, got %r" % (value,))
+    return value
@@ -0,0 +1,105 @@
+"""
+Humanized relative times, such as "3 hours ago" or "in a month".
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+
+from .date import MutableDate, total_microseconds
+from .zones import get_zone
+
+
+DAY = 86400
+MONTH = DAY * 146097 / 4800.0
+YEAR = DAY * 146097 / 400.0
+
+# Moment.js rounds the difference to each unit in turn and picks the first
+# phrase whose threshold it is under; those rules reduce to fixed limits in
+# seconds. A minute, for example, covers up to 89 seconds, because 90
+# seconds round to 2 minutes.
+LIMITS = (44.5, 90, 44.5 * 60, 90 * 60, 21.5 * 3600, 1.5 * DAY, 25.5 * DAY,
+          1.5 * MONTH, 10.5 * MONTH, 1.5 * YEAR)
+
+# The phrase for each span between limits, and the length of the unit it
+# counts (None for phrases without a number).
+PHRASES = (
+    ('a few seconds', None),
+    ('a minute', None),
+    ('%d minutes', 60),
+    ('an hour', None),
+    ('%d hours', 3600),
+    ('a day', None),
+    ('%d days', DAY),
+    ('a month', None),
+    ('%d months', MONTH),
+    ('a year', None),
+    ('%d years', YEAR),
+)
+
+FUTURE = 'in %s'
+PAST = '%s ago'
+
+
+def humanize(seconds, suffix=True):
+    """
+    Describe a signed number of seconds, e.g. -10800 as "3 hours ago".
+    Without `suffix` only the duration ("3 hours") is returned.
+    """
+    span = abs(seconds)
+    phrase, unit = PHRASES[bisect_right(LIMITS, span)]
+    if unit is not None:
+        # Halves round up, as in Moment.js; Python 3's round() would not.
+        phrase = phrase % int(span / float(unit) + 0.5)
+    if not suffix:
+        return phrase
+    return (FUTURE if seconds > 0 else PAST) % phrase
+
+
+def humanize_many(values, reference=None, suffix=True):
+    """
+    Describe many moments or datetimes relative to one reference instant,
+    which defaults to now. Returns a list of strings.
+    """
+    if reference is not None:
+        reference = _datetime(reference)
+    nows = {}
+    phrases = {}
+    result = []
+    for value in values:
+        value = _datetime(value)
+        now = reference
+        if now is None:
+            naive = value.tzinfo is None
+            now = nows.get(naive) or nows.setdefault(naive, _now(naive))
+        seconds = seconds_between(value, now)
+        try:
+            phrase = phrases[seconds]
+        except KeyError:
+            phrase = phrases[seconds] = humanize(seconds, suffix)
+        result.append(phrase)
+    return result
+
+
+def seconds_between(date, other):
+    """Signed whole seconds from `other` to `date`, halves away from zero."""
+    microseconds = total_microseconds(date - other)
+    seconds, rest = divmod(abs(microseconds), 1000000)
+    seconds += rest >= 500000
+    return seconds if microseconds >= 0 else -seconds
+
+
+def now_like(date):
+    """The current time, naive or aware to match `date`."""
+    return _now(date.tzinfo is None)
+
+
+def _now(naive):
+    if naive:
+        return datetime.now()
+    return datetime.now(get_zone('UTC'))
+
+
+def _datetime(value):
+    if isinstance(value, MutableDate):
+        return value.date
+    return value
@@ -0,0 +1,157 @@
+"""
+Parse strings with compiled format plans instead of strptime. Each pattern
+becomes one generated function: patterns made only of fixed-width numbers
+are read by slicing, and everything else is matched by a single regex
+compiled the first time it is needed.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from .formatter import (MONTH_ABBREVIATIONS, MONTH_NAMES, TOKEN,
+                        WEEKDAY_ABBREVIATIONS, WEEKDAY_NAMES)
+from .zones import fixed_offset
+
+
+MONTHS = dict((name.lower(), number)
+              for number, name in enumerate(MONTH_NAMES) if name)
+MONTHS.update((name.lower(), number)
+              for number, name in enumerate(MONTH_ABBREVIATIONS) if name)
+
+_MONTH_NAMES = '|'.join(name for name in MONTH_NAMES if name)
+_MONTH_ABBREVIATIONS = '|'.join(name for name in MONTH_ABBREVIATIONS if name)
+
+
+# Each token is matched by a regex and converted by an expression of the
+# matched text `{}`; the field says which part of the datetime it sets.
+# Numeric tokens that are always the same width when rendered can also be
+# read by slicing, which is tried first.
+SCANNERS = {
+    'YYYY': (r'\d{4}', 4, 'year', 'int({})'),
+    'YY': (r'\d{2}', 2, 'year', 'century(int({}))'),
+    'MMMM': (_MONTH_NAMES, None, 'month', 'MONTHS[{}.lower()]'),
+    'MMM': (_MONTH_ABBREVIATIONS, None, 'month', 'MONTHS[{}.lower()]'),
+    'MM': (r'\d{1,2}', 2, 'month', 'int({})'),
+    'M': (r'\d{1,2}', None, 'month', 'int({})'),
+    'DDDD': (r'\d{3}', 3, 'yday', 'int({})'),
+    'DDD': (r'\d{1,3}', None, 'yday', 'int({})'),
+    'DD': (r'\d{1,2}', 2, 'day', 'int({})'),
+    'D': (r'\d{1,2}', None, 'day', 'int({})'),
+    'dddd': ('|'.join(WEEKDAY_NAMES), None, None, None),
+    'ddd': ('|'.join(WEEKDAY_ABBREVIATIONS), None, None, None),
+    'dd': (r'\d', 1, None, None),
+    'd': (r'\d', 1, None, None),
+    'HH': (r'\d{1,2}', 2, 'hour', 'int({})'),
+    'H': (r'\d{1,2}', None, 'hour', 'int({})'),
+    'hh': (r'\d{1,2}', 2, 'hour12', 'int({})'),
+    'h': (r'\d{1,2}', None, 'hour12', 'int({})'),
+    'mm': (r'\d{1,2}', 2, 'minute', 'int({})'),
+    'm': (r'\d{1,2}', None, 'minute', 'int({})'),
+    'ss': (r'\d{1,2}', 2, 'second', 'int({})'),
+    's': (r'\d{1,2}', None, 'second', 'int({})'),
+    'SSS': (r'\d{1,6}', 3, 'microsecond', 'int(({} + "00000")[:6])'),
+    'A': ('am|pm', None, 'meridiem', '{}.lower()'),
+    'a': ('am|pm', None, 'meridiem', '{}.lower()'),
+    'ZZ': (r'[+-]\d\d:?\d\d|Z', None, 'tzinfo', 'offset({})'),
+    'Z': (r'[+-]\d\d:?\d\d|Z', None, 'tzinfo', 'offset({})'),
+}
+
+# What strptime assumes for fields a pattern doesn't mention.
+DEFAULTS = (('year', '1900'), ('month', '1'), ('day', '1'), ('hour', '0'),
+            ('minute', '0'), ('second', '0'), ('microsecond', '0'),
+            ('tzinfo', 'None'))
+
+
+def century(year):
+    """Expand a two-digit year the way strptime does."""
+    return year + (2000 if year <= 68 else 1900)
+
+
+def hour12(hour, meridiem=''):
+    """Turn a 12-hour clock reading into a 24-hour one."""
+    if meridiem == 'pm':
+        return hour if hour == 12 else hour + 12
+    return 0 if hour == 12 else hour
+
+
+def offset(text):
+    """Turn `Z`, `+hhmm` or `+hh:mm` into a fixed-offset tzinfo."""
+    if text in ('Z', 'z'):
+        return fixed_offset(0)
+    minutes = int(text[1:3]) * 60 + int(text[-2:])
+    return fixed_offset(-minutes if text[0] == '-' else minutes)
+
+
+def from_day_of_year(year, day, *clock):
+    """Datetime for a day of the year, like strptime's %j."""
+    return datetime(year, 1, 1, *clock) + timedelta(days=day - 1)
+
+
+def compile_parser(pattern, tokens):
+    """
+    Turn a tokenized Moment.js format into a function that parses a string
+    into a datetime, raising ValueError when the string doesn't match.
+    """
+    regex = []
+    groups = []
+    slices = []
+    literals = []
+    position = 0
+    for kind, text in tokens:
+        if kind == TOKEN:
+            expression, width, field, conversion = SCANNERS[text]
+            regex.append('(%s)' % expression)
+            groups.append((field, conversion))
+            slices.append((position, width))
+            position = position + width if width and position is not None else None
+        else:
+            regex.append(''.join(r'\s+' if part.isspace() else re.escape(part)
+                                 for part in re.split(r'(\s+)', text) if part))
+            if position is not None:
+                literals.append((position, text))
+                position += len(text)
+    namespace = dict(globals(), PATTERN=pattern)
+    namespace['MATCH'] = _lazy_match(''.join(regex) + r'\Z', namespace)
+
+    lines = ['def parse(string):']
+    if position is not None and groups:
+        # Every token has a fixed width, so try slicing before the regex.
+        fields = ['string[%d:%d]' % (start, start + width) for start, width in slices]
+        checks = ['len(string) == %d' % position]
+        checks.extend('string[%d:%d] == %r' % (start, start + len(text), text)
+                      for start, text in literals)
+        checks.append('(%s).isdigit()' % ' + '.join(fields))
+        lines.append('    if %s:' % ' and '.join(checks))
+        lines.append('        return %s' % _build(groups, fields))
+    lines.append('    match = MATCH(string)')
+    lines.append('    if match is None:')
+    lines.append('        raise ValueError("time data %r does not match format %r"'
+                 ' % (string, PATTERN))')
+    lines.append('    groups = match.groups()')
+    fields = ['groups[%d]' % index for index in range(len(groups))]
+    lines.append('    return %s' % _build(groups, fields))
+    exec('\n'.join(lines) + '\n', namespace)
+    return namespace['parse']
+
+
+def _lazy_match(regex, namespace):
+    """Compile the regex on first use; fixed-width input may never need it."""
+    def match(string):
+        namespace['MATCH'] = re.compile(regex, re.IGNORECASE).match
+        return namespace['MATCH'](string)
+    return match
+
+
+def _build(groups, texts):
+    """Source for the expression that builds the datetime from matched text."""
+    values = {}
+    for (field, conversion), text in zip(groups, texts):
+        if field is not None:
+            values[field] = conversion.format(text)
+    if 'hour12' in values:
+        values['hour'] = 'hour12(%s, %s)' % (values['hour12'], values.get('meridiem', "''"))
+    arguments = [values.get(field, default) for field, default in DEFAULTS]
+    if 'yday' in values:
+        return 'from_day_of_year(%s, %s, %s)' % (
+            arguments[0], values['yday'], ', '.join(arguments[3:]))
+    return 'datetime(%s)' % ', '.join(arguments)
@@ -1,13 +1,81 @@
+from threading import Lock
 
-class switch(object):
-    value = None
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
 
-    def __new__(cls, value):
-        cls.value = value
-        cls.matched = False
-        return True
 
+class LRUCache(object):
+    """
+    A small, bounded, least-recently-used mapping with hit/miss counters.
+    Entries are links `[previous, next, key, value]` in a circular list
+    ordered from least to most recently used, so hits and evictions are
+    both constant time.
+    """
 
-def case(*args):
-    switch.matched = switch.matched or any((arg == switch.value for arg in args))
-    return switch.matched
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None]
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, marking it as recently used."""
+        with self._lock:
+            link = self._data.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            previous, following, _, value = link
+            previous[1] = following
+            following[0] = previous
+            root = self._root
+            last = root[0]
+            last[1] = root[0] = link
+            link[0] = last
+            link[1] = root
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store `value`, evicting the least recently used entry if full."""
+        with self._lock:
+            data, root = self._data, self._root
+            link = data.pop(key, None)
+            if link is not None:
+                link[0][1] = link[1]
+                link[1][0] = link[0]
+            last = root[0]
+            last[1] = root[0] = data[key] = [last, root, key, value]
+            while len(data) > self.maxsize:
+                oldest = root[1]
+                root[1] = oldest[1]
+                oldest[1][0] = root
+                del data[oldest[2]]
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self._root[:] = [self._root, self._root, None, None]
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return a dict of hits, misses, current size and maxsize."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
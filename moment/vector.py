@@ -0,0 +1,156 @@
+"""
+Vectorized date arithmetic over NumPy `datetime64[us]` arrays. NumPy is an
+optional dependency, so `import moment` never imports this module.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from .date import (EPOCH_UNITS, MICROSECOND_UNITS, MONTH_UNITS, MutableDate,
+                   normalize_unit)
+
+
+# The datetime64 resolution each canonical unit truncates to.
+RESOLUTIONS = {
+    'year': 'Y',
+    'month': 'M',
+    'day': 'D',
+    'hour': 'h',
+    'minute': 'm',
+    'second': 's',
+    'millisecond': 'ms',
+}
+
+ONE_DAY = np.timedelta64(1, 'D')
+ONE_MONTH = np.timedelta64(1, 'M')
+ONE_MICROSECOND = np.timedelta64(1, 'us')
+
+
+def shift_months(values, months):
+    """
+    Shift a datetime64 array by a number of months, clamping the day to the
+    length of the target month like `update_month` does.
+    """
+    days = values.astype('M8[D]')
+    start = values.astype('M8[M]')
+    target = start + np.asarray(months, dtype='i8').astype('m8[M]')
+    first = target.astype('M8[D]')
+    length = (target + ONE_MONTH).astype('M8[D]') - first
+    day = np.minimum(days - start.astype('M8[D]'), length - ONE_DAY)
+    return (first + day) + (values - days)
+
+
+class MomentArray(object):
+    """A mutable array of naive UTC datetimes with Moment-like methods."""
+
+    def __init__(self, values):
+        if isinstance(values, MomentArray):
+            values = values.values.copy()
+        elif isinstance(values, np.ndarray) and values.dtype.kind == 'M':
+            values = values.astype('M8[us]')
+        else:
+            values = np.array([_naive(value) for value in values], dtype='M8[us]')
+        self.values = values
+
+    @classmethod
+    def from_epoch(cls, epochs, unit='s'):
+        """Build an array from integer epochs in 's', 'ms', 'us' or 'ns'."""
+        epochs = np.asarray(epochs, dtype='i8') * EPOCH_UNITS[unit] // 1000
+        return cls(epochs.view('M8[us]'))
+
+    def add(self, unit=None, amount=None, **kwargs):
+        """Add time to every date. Amounts may be scalars or arrays."""
+        if unit is not None:
+            kwargs[unit] = amount
+        for unit, amount in kwargs.items():
+            name = normalize_unit(unit)
+            if name in MONTH_UNITS:
+                self.values = shift_months(self.values, np.asarray(amount) * MONTH_UNITS[name])
+            elif name in MICROSECOND_UNITS:
+                delta = np.asarray(amount) * MICROSECOND_UNITS[name]
+                if delta.dtype.kind == 'f':
+                    delta = np.round(delta)
+                self.values = self.values + delta.astype('i8').astype('m8[us]')
+            else:
+                raise ValueError("unknown unit %r" % (unit,))
+        return self
+
+    def sub(self, unit=None, amount=None, **kwargs):
+        """Just in case."""
+        return self.subtract(unit, amount, **kwargs)
+
+    def subtract(self, unit=None, amount=None, **kwargs):
+        """Subtract time from every date."""
+        if unit is not None:
+            kwargs[unit] = amount
+        for unit, amount in kwargs.items():
+            self.add(unit, -np.asarray(amount))
+        return self
+
+    def start_of(self, unit):
+        """Truncate every date to the start of the unit."""
+        name = normalize_unit(unit)
+        values = self.values
+        if name == 'week':
+            days = values.astype('M8[D]')
+            # Same as MutableDate: step back by the ISO weekday, to a Sunday.
+            isoweekday = (days.astype('i8') + 3) % 7 + 1
+            values = days - isoweekday.astype('m8[D]')
+        elif name == 'quarter':
+            months = values.astype('M8[M]')
+            values = months - (months.astype('i8') % 3).astype('m8[M]')
+        elif name in RESOLUTIONS:
+            values = values.astype('M8[%s]' % RESOLUTIONS[name])
+        elif name != 'microsecond':
+            raise ValueError("unknown unit %r" % (unit,))
+        self.values = values.astype('M8[us]')
+        return self
+
+    def end_of(self, unit):
+        """Move every date to the last microsecond of the unit."""
+        if normalize_unit(unit) == 'microsecond':
+            return self
+        self.start_of(unit).add(unit, 1)
+        self.values = self.values - ONE_MICROSECOND
+        return self
+
+    def epoch(self, unit='s'):
+        """Integer epochs as an int64 array, floored to the unit."""
+        return self.values.view('i8') * 1000 // EPOCH_UNITS[unit]
+
+    def to_datetimes(self):
+        """Materialize the array as a list of naive datetimes."""
+        return self.values.astype(object).tolist()
+
+    def clone(self):
+        """Return a copy that can be changed independently."""
+        return MomentArray(self)
+
+    def copy(self):
+        """Same as clone."""
+        return MomentArray(self)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.to_datetimes())
+
+    def __getitem__(self, index):
+        value = self.values[index]
+        if isinstance(value, np.ndarray):
+            return MomentArray(value)
+        return value.astype(object)
+
+    def __repr__(self):
+        return "<MomentArray(%s)>" % (self.values,)
+
+
+def _naive(value):
+    """Turn a Moment or datetime into a naive UTC datetime."""
+    if isinstance(value, MutableDate):
+        value = value.date
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+    return value
@@ -0,0 +1,168 @@
+"""
+A compact binary encoding for sequences of moments, for shipping batches
+between processes. Each value is a zone number plus the difference from
+the previous instant in microseconds, both as varints, and every zone is
+written once in a table at the start. Sorted or clustered timestamps take
+a few bytes each.
+
+Layout, all integers as unsigned LEB128 varints (signed ones zigzagged):
+the format version, the zone count, each zone (0 for naive, 1 and a
+UTF-8 name, or 2 and a signed offset in minutes), the value count, then
+per value its zone number plus one (0 for None) and the signed delta.
+"""
+
+from datetime import timedelta
+
+from .core import EpochMoment
+from .date import EPOCH, MutableDate, epoch_microseconds
+from .zones import from_zone_key, zone_key
+
+
+VERSION = 1
+
+NAIVE, NAMED, FIXED = 0, 1, 2
+
+
+def encode(values):
+    """
+    Encode moments, datetimes or None values into bytes. Zones must have a
+    name or a fixed offset of whole minutes.
+    """
+    zones = {}
+    body = bytearray()
+    previous = 0
+    count = 0
+    for value in values:
+        count += 1
+        if value is None:
+            body.append(0)
+            continue
+        if isinstance(value, EpochMoment):
+            microseconds, tz = value._microseconds, value._tz
+        else:
+            if isinstance(value, MutableDate):
+                value = value.date
+            microseconds, tz = epoch_microseconds(value), value.tzinfo
+        key = zone_key(tz)
+        try:
+            number = zones[key]
+        except KeyError:
+            if hasattr(key, 'utcoffset'):
+                raise ValueError("cannot encode time zone %r" % (key,))
+            number = zones[key] = len(zones)
+        _write(body, number + 1)
+        _write(body, _zigzag(microseconds - previous))
+        previous = microseconds
+
+    data = bytearray()
+    _write(data, VERSION)
+    _write(data, len(zones))
+    for key, number in sorted(zones.items(), key=lambda item: item[1]):
+        if key is None:
+            data.append(NAIVE)
+        elif isinstance(key, int):
+            data.append(FIXED)
+            _write(data, _zigzag(key))
+        else:
+            name = key.encode('utf-8')
+            data.append(NAMED)
+            _write(data, len(name))
+            data.extend(name)
+    _write(data, count)
+    data.extend(body)
+    return bytes(data)
+
+
+def decode(data):
+    """Decode bytes from `encode` into a list of EpochMoments (or None)."""
+    from_microseconds = EpochMoment.from_microseconds
+    return [None if instant is None else from_microseconds(*instant)
+            for instant in _instants(data)]
+
+
+def decode_dates(data):
+    """Decode bytes from `encode` straight into datetimes (or None)."""
+    result = []
+    for instant in _instants(data):
+        if instant is not None:
+            microseconds, tz = instant
+            instant = EPOCH + timedelta(microseconds=microseconds)
+            if tz is not None:
+                instant = tz.fromutc(instant.replace(tzinfo=tz))
+        result.append(instant)
+    return result
+
+
+def _instants(data):
+    """Yield (microseconds, tzinfo) for each encoded value, or None."""
+    try:
+        for instant in _read_instants(bytearray(data)):
+            yield instant
+    except IndexError:
+        raise ValueError("truncated or corrupt encoded moments")
+
+
+def _read_instants(data):
+    version, position = _read(data, 0)
+    if version != VERSION:
+        raise ValueError("unknown encoding version %r" % (version,))
+    count, position = _read(data, position)
+    zones = []
+    for _ in range(count):
+        kind = data[position]
+        position += 1
+        if kind == NAIVE:
+            zones.append(None)
+        elif kind == FIXED:
+            minutes, position = _read(data, position)
+            zones.append(from_zone_key(_unzigzag(minutes)))
+        elif kind == NAMED:
+            length, position = _read(data, position)
+            name = bytes(data[position:position + length])
+            if len(name) != length:
+                raise IndexError
+            name = name.decode('utf-8')
+            zones.append(from_zone_key(str(name)))
+            position += length
+        else:
+            raise ValueError("unknown zone kind %r" % (kind,))
+
+    count, position = _read(data, position)
+    microseconds = 0
+    for _ in range(count):
+        number, position = _read(data, position)
+        if not number:
+            yield None
+            continue
+        delta, position = _read(data, position)
+        microseconds += _unzigzag(delta)
+        yield microseconds, zones[number - 1]
+
+
+def _zigzag(number):
+    """Map signed integers onto unsigned ones, small magnitudes first."""
+    return number * 2 if number >= 0 else -number * 2 - 1
+
+
+def _unzigzag(number):
+    return number >> 1 if not number & 1 else -((number + 1) >> 1)
+
+
+def _write(buffer, number):
+    """Append an unsigned varint."""
+    while number > 0x7f:
+        buffer.append(number & 0x7f | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def _read(buffer, position):
+    """Read an unsigned varint, returning it and the next position."""
+    number = shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, position
+        shift += 7
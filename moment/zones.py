@@ -0,0 +1,215 @@
+"""
+A process-wide time zone registry. Zones are resolved by name once by the
+active backend: pytz (the default) or the standard library's zoneinfo.
+For pytz, each zone's UTC transitions are flattened into a sorted list of
+epoch seconds, so converting a timestamp is a single bisect.
+"""
+
+from bisect import bisect_right
+from datetime import timedelta
+
+from .date import EPOCH, epoch_microseconds, total_microseconds
+
+
+_INDEXES = {}
+
+
+class PytzBackend(object):
+    """
+    Zones from pytz. pytz itself is only imported the first time a zone is
+    needed, to keep `import moment` fast.
+    """
+
+    name = 'pytz'
+
+    def __init__(self):
+        self._zones = {}
+        self._offsets = {}
+
+    def get_zone(self, name):
+        try:
+            return self._zones[name]
+        except KeyError:
+            import pytz
+            zone = self._zones[name] = pytz.timezone(name)
+            return zone
+
+    def fixed_offset(self, minutes):
+        try:
+            return self._offsets[minutes]
+        except KeyError:
+            import pytz
+            offset = self._offsets[minutes] = pytz.FixedOffset(minutes)
+            return offset
+
+    def localize(self, date, name):
+        return self.get_zone(name).localize(date)
+
+    def to_zone(self, date, name):
+        return get_index(name).from_microseconds(epoch_microseconds(date))
+
+
+class ZoneInfoBackend(object):
+    """
+    Zones from the standard library's zoneinfo (or its backport), which
+    caches zones itself and resolves ambiguous times with `fold`.
+    Localizing is a plain `replace` and converting a plain `astimezone`.
+    """
+
+    name = 'zoneinfo'
+
+    def __init__(self):
+        try:
+            from zoneinfo import ZoneInfo
+        except ImportError:
+            from backports.zoneinfo import ZoneInfo
+        from datetime import timezone
+        self._zone_info = ZoneInfo
+        self._timezone = timezone
+        self._utc = ZoneInfo('UTC')
+
+    def get_zone(self, name):
+        return self._zone_info(name)
+
+    def fixed_offset(self, minutes):
+        return self._timezone(timedelta(minutes=minutes))
+
+    def localize(self, date, name):
+        return date.replace(tzinfo=self._zone_info(name))
+
+    def to_zone(self, date, name):
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=self._utc)
+        return date.astimezone(self._zone_info(name))
+
+
+BACKENDS = {'pytz': PytzBackend, 'zoneinfo': ZoneInfoBackend}
+
+_PYTZ = PytzBackend()
+_BACKEND = _PYTZ
+
+
+def set_backend(name):
+    """
+    Switch every zone lookup and conversion to the 'pytz' or 'zoneinfo'
+    backend. Raises ImportError when the backend's package is missing.
+    """
+    global _BACKEND
+    if name not in BACKENDS:
+        raise ValueError("unknown time zone backend %r" % (name,))
+    if name != _BACKEND.name:
+        _BACKEND = _PYTZ if name == 'pytz' else BACKENDS[name]()
+
+
+def get_backend():
+    """Name of the active time zone backend."""
+    return _BACKEND.name
+
+
+def get_zone(name):
+    """Return the active backend's cached time zone for `name`."""
+    return _BACKEND.get_zone(name)
+
+
+def fixed_offset(minutes):
+    """Return a tzinfo `minutes` east of UTC."""
+    return _BACKEND.fixed_offset(minutes)
+
+
+def localize(date, name):
+    """Attach zone `name` to a naive local datetime."""
+    return _BACKEND.localize(date, name)
+
+
+def zone_key(tzinfo):
+    """
+    A compact, picklable stand-in for a tzinfo: its zone name, its offset
+    in minutes if it is a fixed offset of whole minutes, or None for naive
+    dates. Anything else is returned as is.
+    """
+    if tzinfo is None:
+        return None
+    name = getattr(tzinfo, 'zone', None) or getattr(tzinfo, 'key', None)
+    if name:
+        return name
+    offset = tzinfo.utcoffset(None)
+    if offset is not None:
+        minutes, rest = divmod(total_microseconds(offset), 60000000)
+        if not rest:
+            return minutes
+    return tzinfo
+
+
+def from_zone_key(key):
+    """The tzinfo a `zone_key` stands for, from the active backend."""
+    if key is None or hasattr(key, 'utcoffset'):
+        return key
+    if isinstance(key, int):
+        return fixed_offset(key)
+    return get_zone(key)
+
+
+def get_index(name):
+    """Return the cached `ZoneIndex` for `name`, which is always pytz-based."""
+    try:
+        return _INDEXES[name]
+    except KeyError:
+        index = _INDEXES[name] = ZoneIndex(_PYTZ.get_zone(name))
+        return index
+
+
+class ZoneIndex(object):
+    """Precomputed UTC transition table for a single time zone."""
+
+    def __init__(self, zone):
+        self.zone = zone
+        transitions = getattr(zone, '_utc_transition_times', None)
+        if transitions:
+            self.transitions = [total_microseconds(when - EPOCH) // 1000000
+                                for when in transitions]
+            self.tzinfos = [zone._tzinfos[info] for info in zone._transition_info]
+        else:
+            self.transitions = []
+            self.tzinfos = [zone]
+        self.offsets = [total_microseconds(tzinfo._utcoffset) for tzinfo in self.tzinfos]
+
+    def position(self, seconds):
+        """Index of the transition in effect at `seconds` since epoch."""
+        return max(bisect_right(self.transitions, seconds) - 1, 0)
+
+    def utcoffset(self, seconds):
+        """UTC offset, in seconds, in effect at `seconds` since epoch."""
+        return self.offsets[self.position(seconds)] // 1000000
+
+    def from_microseconds(self, microseconds):
+        """Aware local datetime for integer microseconds since epoch."""
+        position = self.position(microseconds // 1000000)
+        local = EPOCH + timedelta(microseconds=microseconds + self.offsets[position])
+        return local.replace(tzinfo=self.tzinfos[position])
+
+    def from_utc(self, timestamp):
+        """Aware local datetime for a Unix timestamp in seconds."""
+        position = self.position(timestamp)
+        local = EPOCH + timedelta(seconds=timestamp,
+                                  microseconds=self.offsets[position])
+        return local.replace(tzinfo=self.tzinfos[position])
+
+
+def from_utc(timestamp, name):
+    """Convert a Unix timestamp into an aware datetime in zone `name`."""
+    return get_index(name).from_utc(timestamp)
+
+
+def from_utc_many(timestamps, name):
+    """Lazily convert a sequence of Unix timestamps into zone `name`."""
+    convert = get_index(name).from_utc
+    for timestamp in timestamps:
+        yield convert(timestamp)
+
+
+def to_zone(date, name):
+    """
+    Convert a datetime into zone `name`. Naive datetimes are taken to be in
+    UTC.
+    """
+    return _BACKEND.to_zone(date, name)
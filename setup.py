@@ -20,8 +20,12 @@ setup(
     ],
     install_requires=[
         'pytz',
-        'times'
     ],
+    extras_require={
+        'numpy': ['numpy'],
+        'arrow': ['numpy', 'pyarrow'],
+        'zoneinfo': ['backports.zoneinfo; python_version < "3.9"'],
+    },
     license='MIT',
     classifiers=[
         'Development Status :: 1 - Planning',
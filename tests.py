@@ -1,9 +1,44 @@
 #!/usr/bin/env python
 
-from unittest import TestCase, main
-from datetime import datetime
+from unittest import TestCase, main, skipIf
+from datetime import date, datetime, timedelta, tzinfo
+from multiprocessing.pool import ThreadPool
+import os
+import pickle
 import pytz
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import BytesIO, StringIO
 import moment
+from moment import months, parallel, zones
+from moment.date import to_epoch
+from moment.relative import humanize
+from moment.parse import (LITERAL, clear_format_cache, compile_format,
+                          disable_parse_cache, enable_parse_cache,
+                          format_cache_info, parse_cache_info, parse_js_date)
+from moment.utils import LRUCache
+
+try:
+    import zoneinfo
+except ImportError:
+    try:
+        from backports import zoneinfo
+    except ImportError:
+        zoneinfo = None
+
+try:
+    import numpy
+    from moment import interop
+    from moment.vector import MomentArray
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 
 class SimpleAPI(TestCase):
@@ -121,6 +156,104 @@ class Replacement(TestCase):
         self.assertEquals(d, expecting)
 
 
+class ThreadSafety(TestCase):
+
+    units = ('year', 'quarter', 'month', 'week', 'day', 'hour', 'minute', 'second')
+
+    def setUp(self):
+        if hasattr(sys, 'setswitchinterval'):
+            self.interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+        else:
+            self.interval = sys.getcheckinterval()
+            sys.setcheckinterval(1)
+
+    def tearDown(self):
+        if hasattr(sys, 'setswitchinterval'):
+            sys.setswitchinterval(self.interval)
+        else:
+            sys.setcheckinterval(self.interval)
+
+    def test_start_and_end_of_from_many_threads(self):
+        dates = [datetime(2012, 1, 1) + timedelta(hours=7 * i, seconds=i) for i in range(400)]
+        jobs = [(date, unit) for date in dates for unit in self.units]
+
+        def truncate(job):
+            date, unit = job
+            return (moment.date(date).start_of(unit).date,
+                    moment.date(date).end_of(unit).date)
+
+        expecting = [truncate(job) for job in jobs]
+        pool = ThreadPool(16)
+        try:
+            results = pool.map(truncate, jobs, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        self.assertEquals(results, expecting)
+
+
+class UnitAliases(TestCase):
+
+    def test_short_unit_aliases(self):
+        d = moment.date(2012, 12, 18)
+        d.add('d', 1).add('h', 2).add('m', 3).add('s', 4).add('ms', 5)
+        self.assertEquals(d, datetime(2012, 12, 19, 2, 3, 4, 5000))
+        d.subtract('M', 1).subtract('y', 1).subtract('w', 1)
+        self.assertEquals(d, datetime(2011, 11, 12, 2, 3, 4, 5000))
+
+    def test_keywords_are_coalesced_with_months_first(self):
+        d = moment.date(2012, 1, 31)
+        d.add(months=1, days=1, hours=1)
+        self.assertEquals(d, datetime(2012, 3, 1, 1))
+
+    def test_subtract_mixed_keywords(self):
+        d = moment.date(2012, 3, 31, 12)
+        d.subtract(quarters=1, weeks=1, minutes=30)
+        self.assertEquals(d, datetime(2011, 12, 24, 11, 30))
+
+    def test_replace_with_aliases_in_one_step(self):
+        d = moment.date(2012, 1, 31)
+        d.replace(months=2, days=29, h=5)
+        self.assertEquals(d, datetime(2012, 2, 29, 5))
+
+    def test_start_and_end_of_with_aliases(self):
+        d = moment.date(2012, 12, 18, 10, 30)
+        self.assertEquals(d.clone().start_of('h'), datetime(2012, 12, 18, 10))
+        self.assertEquals(d.clone().end_of('M'), datetime(2012, 12, 31, 23, 59, 59, 999999))
+
+
+class CalendarArithmetic(TestCase):
+
+    def test_shift_months_clamps_to_month_length(self):
+        self.assertEquals(months.shift_months(datetime(2012, 1, 31, 5), 1),
+                          datetime(2012, 2, 29, 5))
+        self.assertEquals(months.shift_months(datetime(2012, 3, 31), -13),
+                          datetime(2011, 2, 28))
+
+    def test_shift_months_keeps_tzinfo(self):
+        d = moment.utc(2012, 10, 31, 12).date
+        self.assertEquals(months.shift_months(d, 4).tzinfo, pytz.utc)
+
+    def test_shift_months_many(self):
+        dates = [datetime(2012, 1, 31), datetime(2012, 1, 31, 1), datetime(2012, 6, 15)]
+        self.assertEquals(months.shift_months_many(dates, 1),
+                          [datetime(2012, 2, 29), datetime(2012, 2, 29, 1), datetime(2012, 7, 15)])
+
+    def test_tables_match_the_calendar(self):
+        for year in (1900, 2000, 2012, 2013):
+            for month in range(1, 13):
+                first = datetime(year, month, 1)
+                self.assertEquals(months.ordinal(year, month, 1), first.toordinal())
+                self.assertEquals(months.day_of_year(first), first.timetuple().tm_yday)
+                self.assertEquals(months.days_in_month(year, month),
+                                  (months.shift_months(first, 1) - first).days)
+
+    def test_moment_year_and_quarter_shifts(self):
+        self.assertEquals(moment.date(2012, 2, 29).add(years=1), datetime(2013, 2, 28))
+        self.assertEquals(moment.date(2012, 11, 30).subtract(quarters=3), datetime(2012, 2, 29))
+
+
 class Weekdays(TestCase):
 
     def test_weekdays_can_be_manipulated(self):
@@ -316,5 +449,957 @@ class StartEndOfUnit(TestCase):
         self.assertEquals(d.end_of('second'), expecting)
         self.assertEquals(d.end_of('seconds'), expecting)
 
+
+class IsoParsing(TestCase):
+
+    def test_date_function_with_iso_datetime(self):
+        d = moment.date("2012-12-18T10:30:05.123")
+        self.assertEquals(d, datetime(2012, 12, 18, 10, 30, 5, 123000))
+
+    def test_date_function_with_basic_format(self):
+        d = moment.date("20121218T103005")
+        self.assertEquals(d, datetime(2012, 12, 18, 10, 30, 5))
+
+    def test_iso_offsets_are_tz_aware(self):
+        d = moment.date("2012-12-18T10:30:00-05:00")
+        self.assertEquals(d.tzinfo.utcoffset(d.date), timedelta(hours=-5))
+        self.assertEquals(d, datetime(2012, 12, 18, 15, 30, tzinfo=pytz.utc))
+
+    def test_utc_function_with_zulu_string(self):
+        d = moment.utc("2012-12-18T10:30:00Z")
+        self.assertEquals(d, datetime(2012, 12, 18, 10, 30, tzinfo=pytz.utc))
+
+    def test_utc_function_converts_offsets(self):
+        d = moment.utc("2012-12-18T10:30:00+0100")
+        self.assertEquals(d.hour, 9)
+        self.assertEquals(d.tzinfo, pytz.utc)
+
+    def test_invalid_iso_string_raises(self):
+        self.assertRaises(ValueError, moment.date, "2012-12-18T10:3")
+        self.assertRaises(ValueError, moment.date, "December 18")
+
+    def test_unpadded_dates_fall_back_to_strptime(self):
+        self.assertEquals(moment.date("2012-1-5"), datetime(2012, 1, 5))
+        self.assertEquals(list(moment.parse_many(["2012-1-5"])), [datetime(2012, 1, 5)])
+        try:
+            moment.date("December 18")
+        except ValueError as error:
+            self.assertTrue("'%Y-%m-%d'" in str(error))
+
+
+class BulkParsing(TestCase):
+
+    def test_parse_many_yields_datetimes(self):
+        dates = moment.parse_many(["12-18-2012", "1-2-2013"], "M-D-YYYY")
+        self.assertEquals(list(dates), [datetime(2012, 12, 18), datetime(2013, 1, 2)])
+
+    def test_parse_many_is_lazy(self):
+        strings = ("2012-12-%02d" % day for day in range(1, 32))
+        dates = moment.parse_many(strings)
+        self.assertEquals(next(dates), datetime(2012, 12, 1))
+
+    def test_parse_many_with_epoch_unit(self):
+        epochs = moment.parse_many(["2012-12-18T00:00:00.5Z"], unit='ms')
+        self.assertEquals(list(epochs), [1355788800500])
+
+    def test_parse_many_with_timezone(self):
+        dates = list(moment.parse_many(["2012-12-18 10:00"], tz="US/Eastern", unit='s'))
+        self.assertEquals(dates, [1355842800])
+
+    def test_parse_many_collects_errors(self):
+        errors = []
+        dates = list(moment.parse_many(["2012-12-18", "nope", None], errors=errors))
+        self.assertEquals(dates, [datetime(2012, 12, 18), None, None])
+        self.assertEquals([error[:2] for error in errors], [(1, "nope"), (2, None)])
+
+    def test_parse_many_raises_without_errors_list(self):
+        dates = moment.parse_many(["nope"])
+        self.assertRaises(ValueError, list, dates)
+
+
+@skipIf(numpy is None, "numpy is not installed")
+class VectorArithmetic(TestCase):
+
+    dates = [datetime(2012, 1, 31, 10, 30), datetime(2012, 12, 19, 1, 2, 3, 4)]
+
+    def test_add_months_clamps_like_scalar_dates(self):
+        values = MomentArray(self.dates).add(months=1).to_datetimes()
+        expecting = [moment.date(d).add(months=1).date for d in self.dates]
+        self.assertEquals(values, expecting)
+        self.assertEquals(values[0], datetime(2012, 2, 29, 10, 30))
+
+    def test_add_and_subtract_fixed_units(self):
+        values = MomentArray(self.dates).add(days=2).subtract('hours', 1)
+        expecting = [d + timedelta(days=2, hours=-1) for d in self.dates]
+        self.assertEquals(values.to_datetimes(), expecting)
+
+    def test_add_with_array_of_amounts(self):
+        values = MomentArray(self.dates).add('years', numpy.array([1, -1]))
+        self.assertEquals(values[0], datetime(2013, 1, 31, 10, 30))
+        self.assertEquals(values[1], datetime(2011, 12, 19, 1, 2, 3, 4))
+
+    def test_start_and_end_of_match_scalar_dates(self):
+        for unit in ('year', 'quarter', 'month', 'week', 'day', 'hour', 'minute', 'second'):
+            start = MomentArray(self.dates).start_of(unit).to_datetimes()
+            end = MomentArray(self.dates).end_of(unit).to_datetimes()
+            self.assertEquals(start, [moment.date(d).start_of(unit).date for d in self.dates])
+            self.assertEquals(end, [moment.date(d).end_of(unit).date for d in self.dates])
+
+    def test_epoch_round_trip(self):
+        values = MomentArray(self.dates)
+        epochs = values.epoch('us')
+        self.assertEquals(MomentArray.from_epoch(epochs, 'us').to_datetimes(), self.dates)
+
+    def test_aware_values_are_converted_to_utc(self):
+        d = moment.utc(2012, 12, 18).timezone("US/Eastern")
+        self.assertEquals(MomentArray([d])[0], datetime(2012, 12, 18))
+
+
+class TimeZones(TestCase):
+
+    def test_timezone_converts_utc_moment(self):
+        d = moment.utc(2012, 12, 18, 15).timezone("US/Eastern")
+        self.assertEquals(d.hour, 10)
+        self.assertEquals(d.date.tzname(), "EST")
+
+    def test_timezone_respects_daylight_saving(self):
+        d = moment.utc(2012, 7, 18, 15).timezone("US/Eastern")
+        self.assertEquals(d.hour, 11)
+        self.assertEquals(d.date.tzname(), "EDT")
+
+    def test_timezone_treats_naive_dates_as_utc(self):
+        d = moment.date(2012, 12, 18, 15).timezone("Asia/Kolkata")
+        self.assertEquals((d.hour, d.minute), (20, 30))
+
+    def test_locale_then_timezone(self):
+        d = moment.date(2012, 12, 18, 9).locale("US/Pacific").timezone("US/Eastern")
+        self.assertEquals(d.hour, 12)
+
+    def test_zones_are_cached(self):
+        self.assertTrue(zones.get_zone("US/Eastern") is zones.get_zone("US/Eastern"))
+        self.assertTrue(zones.get_index("US/Eastern") is zones.get_index("US/Eastern"))
+
+    def test_from_utc_many(self):
+        dates = list(zones.from_utc_many([1355842800, 1342623600], "US/Eastern"))
+        self.assertEquals([d.hour for d in dates], [10, 11])
+        self.assertEquals([d.tzname() for d in dates], ["EST", "EDT"])
+
+
+class Immutability(TestCase):
+
+    def test_frozen_moment_returns_new_instances(self):
+        d = moment.FrozenMoment(2012, 12, 18)
+        later = d.add(days=1, hours=2)
+        self.assertEquals(d, datetime(2012, 12, 18))
+        self.assertEquals(later, datetime(2012, 12, 19, 2))
+        self.assertTrue(isinstance(later, moment.FrozenMoment))
+
+    def test_frozen_truncation_and_replacement(self):
+        d = moment.date(2012, 12, 18, 1, 2, 3).freeze()
+        self.assertEquals(d.start_of('month'), datetime(2012, 12, 1))
+        self.assertEquals(d.end_of('day'), datetime(2012, 12, 18, 23, 59, 59, 999999))
+        self.assertEquals(d.zero, datetime(2012, 12, 18))
+        self.assertEquals(d, datetime(2012, 12, 18, 1, 2, 3))
+
+    def test_frozen_clone_is_itself(self):
+        d = moment.FrozenMoment(2012, 12, 18)
+        self.assertTrue(d.clone() is d)
+        self.assertEquals(hash(d), hash(d.thaw().freeze()))
+
+    def test_thaw_returns_mutable_moment(self):
+        d = moment.FrozenMoment(2012, 12, 18).thaw()
+        d.add(days=1)
+        self.assertEquals(type(d), moment.Moment)
+        self.assertEquals(d, datetime(2012, 12, 19))
+
+    def test_moments_have_no_instance_dict(self):
+        self.assertFalse(hasattr(moment.date(2012, 12, 18), '__dict__'))
+        self.assertFalse(hasattr(moment.FrozenMoment(2012, 12, 18), '__dict__'))
+
+    def test_clone_keeps_formula(self):
+        d = moment.date("2012-12-18")
+        self.assertEquals(repr(d.clone()), "<Moment(2012-12-18)>")
+
+    def test_moments_can_be_pickled(self):
+        d = moment.utc(2012, 12, 18)
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            self.assertEquals(pickle.loads(pickle.dumps(d, protocol)), d)
+
+
+class EpochRepresentation(TestCase):
+
+    def test_epoch_moment_equals_datetime_moment(self):
+        d = moment.EpochMoment(2012, 12, 18, 1, 2, 3)
+        self.assertEquals(d, moment.date(2012, 12, 18, 1, 2, 3))
+        self.assertEquals(d.year, 2012)
+
+    def test_fixed_unit_arithmetic(self):
+        d = moment.EpochMoment(2012, 12, 18)
+        d.add(hours=1, minutes=2).subtract('milliseconds', 500)
+        self.assertEquals(d, datetime(2012, 12, 18, 1, 1, 59, 500000))
+
+    def test_calendar_arithmetic(self):
+        d = moment.EpochMoment(2012, 1, 31).add(months=1)
+        self.assertEquals(d, datetime(2012, 2, 29))
+        self.assertEquals(d.end_of('month'), datetime(2012, 2, 29, 23, 59, 59, 999999))
+
+    def test_integer_epoch(self):
+        d = moment.EpochMoment(2012, 12, 18, 0, 0, 0, 600000)
+        self.assertEquals(d.epoch(), 1355788801)
+        self.assertEquals(d.epoch(milliseconds=True), 1355788801000)
+        self.assertEquals(d.epoch(rounding=False), 1355788800.6)
+        self.assertEquals(moment.EpochMoment().epoch(), None)
+
+    def test_aware_moment_is_relocalized(self):
+        d = moment.EpochMoment.from_microseconds(1341878400000000, "US/Eastern")
+        self.assertEquals(d.hour, 20)
+        d.add(days=180)
+        self.assertEquals(d.hour, 19)
+        self.assertEquals(d.date.tzname(), "EST")
+
+    def test_clone_is_independent(self):
+        d = moment.EpochMoment(2012, 12, 18)
+        later = d.clone().add(days=1)
+        self.assertEquals(d, datetime(2012, 12, 18))
+        self.assertEquals(later, datetime(2012, 12, 19))
+        self.assertTrue(isinstance(later, moment.EpochMoment))
+
+
+class Ranges(TestCase):
+
+    def test_range_with_fixed_step(self):
+        r = moment.range(datetime(2012, 1, 1), datetime(2012, 1, 2), '15 minutes')
+        self.assertEquals(len(r), 96)
+        self.assertEquals(len(list(r)), 96)
+        self.assertEquals(r[-1], datetime(2012, 1, 1, 23, 45))
+        self.assertEquals(r.index(datetime(2012, 1, 1, 6)), 24)
+        self.assertFalse(datetime(2012, 1, 1, 6, 1) in r)
+
+    def test_range_with_calendar_step(self):
+        r = moment.range(moment.date(2012, 1, 31), datetime(2012, 5, 1), 'month')
+        self.assertEquals(list(r), [datetime(2012, 1, 31), datetime(2012, 2, 29),
+                                    datetime(2012, 3, 31), datetime(2012, 4, 30)])
+        self.assertEquals(len(r), 4)
+        self.assertEquals(r.index(datetime(2012, 3, 31)), 2)
+
+    def test_range_with_alignment_and_epochs(self):
+        r = moment.range(datetime(2012, 12, 18, 10, 5), datetime(2012, 12, 18, 13),
+                         (1, 'hour'), align='hour', unit='s')
+        self.assertEquals(list(r), [1355824800, 1355828400, 1355832000])
+        self.assertEquals(r[1], 1355828400)
+
+    def test_range_counting_down(self):
+        r = moment.range(datetime(2012, 1, 3), datetime(2012, 1, 1), timedelta(days=-1))
+        self.assertEquals(list(r), [datetime(2012, 1, 3), datetime(2012, 1, 2)])
+
+    def test_empty_range(self):
+        r = moment.range(datetime(2012, 1, 2), datetime(2012, 1, 1), 'day')
+        self.assertEquals(len(r), 0)
+        self.assertEquals(list(r), [])
+        self.assertRaises(IndexError, r.__getitem__, 0)
+
+    def test_invalid_step(self):
+        self.assertRaises(ValueError, moment.range, datetime(2012, 1, 1),
+                          datetime(2012, 1, 2), '0 days')
+
+
+class Buckets(TestCase):
+
+    def test_fixed_buckets_in_utc(self):
+        stamps = [1355825100, 1355825100.5, 1355828399]
+        self.assertEquals(list(moment.bucket(stamps, 'hour')), [1355824800] * 3)
+        self.assertEquals(list(moment.bucket([1355825100], 'day')), [1355788800])
+
+    def test_weeks_start_on_sunday(self):
+        sunday = to_epoch(datetime(2012, 12, 16))
+        saturday = to_epoch(datetime(2012, 12, 22, 23))
+        self.assertEquals(list(moment.bucket([sunday, saturday], 'week')), [sunday] * 2)
+
+    def test_calendar_buckets(self):
+        stamp = to_epoch(datetime(2012, 12, 18, 10, 5))
+        self.assertEquals(list(moment.bucket([stamp], 'month')),
+                          [to_epoch(datetime(2012, 12, 1))])
+        self.assertEquals(list(moment.bucket([stamp], 'Q')),
+                          [to_epoch(datetime(2012, 10, 1))])
+        self.assertEquals(list(moment.bucket([stamp, 0], 'year')),
+                          [to_epoch(datetime(2012, 1, 1)), 0])
+
+    def test_days_across_daylight_saving_time(self):
+        eastern = pytz.timezone('US/Eastern')
+        starts = [eastern.localize(datetime(2012, 3, day)) for day in (11, 12)]
+        starts = [to_epoch(start) for start in starts]
+        self.assertEquals(starts[1] - starts[0], 23 * 3600)
+        stamps = [starts[0], starts[1] - 1, starts[1], starts[1] + 3600]
+        self.assertEquals(list(moment.bucket(stamps, 'day', 'US/Eastern')),
+                          [starts[0], starts[0], starts[1], starts[1]])
+
+    def test_hours_in_a_zone_with_a_half_hour_offset(self):
+        stamp = to_epoch(datetime(2012, 12, 18, 10, 5))
+        self.assertEquals(list(moment.bucket([stamp], 'hour', 'Asia/Kolkata')),
+                          [to_epoch(datetime(2012, 12, 18, 9, 30))])
+
+    def test_group_buckets(self):
+        stamps = [0, 10, 3599, 3600, 7300, 7301]
+        self.assertEquals(list(moment.group_buckets(stamps, 'h')),
+                          [(0, 3), (3600, 1), (7200, 2)])
+        events = [(0, 'a'), (3600, 'b'), (3601, 'c')]
+        grouped = moment.group_buckets(events, 'hour', key=lambda event: event[0],
+                                       items=True)
+        self.assertEquals(list(grouped), [(0, [(0, 'a')]),
+                                          (3600, [(3600, 'b'), (3601, 'c')])])
+
+    def test_invalid_unit(self):
+        self.assertRaises(ValueError, list, moment.bucket([0], 'fortnight'))
+
+
+class ParseCaching(TestCase):
+
+    def setUp(self):
+        enable_parse_cache(maxsize=2)
+
+    def tearDown(self):
+        disable_parse_cache()
+
+    def test_repeated_strings_hit_the_cache(self):
+        for _ in range(3):
+            d = moment.date("2012-12-18 10:05:03", "YYYY-MM-DD HH:mm:ss")
+        self.assertEquals(d, datetime(2012, 12, 18, 10, 5, 3))
+        info = parse_cache_info()
+        self.assertEquals((info['hits'], info['misses'], info['size']), (2, 1, 1))
+
+    def test_cache_is_bounded(self):
+        strings = ["2012-12-%02d" % day for day in range(1, 10)]
+        self.assertEquals(list(moment.parse_many(strings)),
+                          [datetime(2012, 12, day) for day in range(1, 10)])
+        self.assertEquals(parse_cache_info()['size'], 2)
+
+    def test_cache_is_keyed_by_time_zone(self):
+        utc = list(moment.parse_many(["2012-12-18T10:00:00"], tz='UTC'))
+        eastern = list(moment.parse_many(["2012-12-18T10:00:00"], tz='US/Eastern'))
+        self.assertNotEqual(utc, eastern)
+
+    def test_shared_date_prefix_only_parses_the_clock(self):
+        strings = ["2012-12-18 10:05:03", "2012-12-18 10:05:04", "2012-12-19 00:00:00",
+                   "2012-12-19 23:59:59"]
+        self.assertEquals(list(moment.parse_many(strings, "%Y-%m-%d %H:%M:%S")),
+                          [datetime.strptime(s, "%Y-%m-%d %H:%M:%S") for s in strings])
+        self.assertEquals(parse_cache_info()['prefix_hits'], 2)
+
+    def test_prefix_path_falls_back_to_strptime(self):
+        moment.date("2012-12-18 10:05:03", "YYYY-MM-DD HH:mm:ss")
+        self.assertRaises(ValueError, moment.date, "2012-12-18 25:05:03",
+                          "YYYY-MM-DD HH:mm:ss")
+        self.assertEquals(moment.date("2012-12-18 1:05:03", "YYYY-MM-DD HH:mm:ss"),
+                          datetime(2012, 12, 18, 1, 5, 3))
+
+    def test_prefix_path_rejects_what_the_format_rejects(self):
+        for formula, string in [("%Y-%m-%d %H:%M:%S", "2012-12-18 10:05+01"),
+                                ("%Y-%m-%d %H:%M", "2012-12-18 1005Z")]:
+            moment.date(string[:10] + " 00:00:00"[:len(formula) - 8], formula)
+            self.assertRaises(ValueError, moment.date, string, formula)
+
+    def test_disabled_by_default(self):
+        disable_parse_cache()
+        moment.date("2012-12-18")
+        self.assertEquals(parse_cache_info(), None)
+
+
+class UnixTimestamps(TestCase):
+
+    def test_units_are_guessed_from_magnitude(self):
+        expected = datetime(2012, 12, 18, 0, 0, 0, 123000)
+        for timestamp in (1355788800.123, 1355788800123, 1355788800123000,
+                          1355788800123000000):
+            self.assertEquals(moment.unix(timestamp, utc=True), expected)
+
+    def test_explicit_unit(self):
+        d = moment.unix(1355788800, utc=True, unit='ms')
+        self.assertEquals(d, datetime(1970, 1, 16, 16, 36, 28, 800000))
+        self.assertRaises(ValueError, moment.unix, 1, unit='minutes')
+
+    def test_integers_keep_full_precision(self):
+        d = moment.unix(1355788800123456, utc=True, unit='us')
+        self.assertEquals(d.microsecond, 123456)
+        d = moment.unix(-1, utc=True, unit='us')
+        self.assertEquals(d, datetime(1969, 12, 31, 23, 59, 59, 999999))
+
+    def test_local_time(self):
+        timestamp = 1355788800
+        self.assertEquals(moment.unix(timestamp * 1000, unit='ms'),
+                          datetime.fromtimestamp(timestamp))
+
+    def test_unix_many(self):
+        dates = moment.unix_many([0, 1000, 1355788800123], utc=True, unit='ms')
+        self.assertEquals(list(dates), [datetime(1970, 1, 1), datetime(1970, 1, 1, 0, 0, 1),
+                                        datetime(2012, 12, 18, 0, 0, 0, 123000)])
+        dates = moment.unix_many([1355788800, 1355788800000], utc=True)
+        self.assertEquals(list(dates), [datetime(2012, 12, 18)] * 2)
+
+
+class StartupCost(TestCase):
+
+    # Wall-clock guard for interpreters without -X importtime. It is loose,
+    # because it covers the interpreter's own imports and process noise too,
+    # so it catches regressions like an eager pytz import, not the few
+    # milliseconds moment itself is meant to take.
+    IMPORT_BUDGET = 0.05
+
+    # Self time of moment's own modules, with their bytecode cached.
+    MODULES_BUDGET_US = 6000
+
+    def run_python(self, code, *options, **env):
+        here = os.path.dirname(os.path.abspath(__file__))
+        environ = dict(os.environ, **env)
+        command = [sys.executable] + list(options) + ['-c', code]
+        return subprocess.check_output(command, cwd=here, env=environ,
+                                       stderr=subprocess.STDOUT).strip()
+
+    def test_import_does_not_load_optional_dependencies(self):
+        loaded = self.run_python(
+            "import sys, moment; "
+            "print(' '.join(m for m in ('pytz', 'times', 'numpy') if m in sys.modules))")
+        self.assertEquals(loaded, b'')
+
+    def test_time_zones_load_pytz_on_demand(self):
+        loaded = self.run_python(
+            "import sys, moment; moment.utcnow(); print('pytz' in sys.modules)")
+        self.assertEquals(loaded, b'True')
+
+    def test_import_stays_within_budget(self):
+        code = "import time; start = time.time(); import moment; print(time.time() - start)"
+        elapsed = min(float(self.run_python(code)) for _ in range(3))
+        self.assertTrue(elapsed < self.IMPORT_BUDGET, elapsed)
+
+    @skipIf(sys.version_info < (3, 8), "needs -X importtime and PYTHONPYCACHEPREFIX")
+    def test_own_modules_import_in_a_few_milliseconds(self):
+        cache = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache)
+        env = {'PYTHONPYCACHEPREFIX': cache, 'PYTHONDONTWRITEBYTECODE': ''}
+        self.run_python("import moment", **env)
+        timings = []
+        for _ in range(5):
+            output = self.run_python("import moment", '-X', 'importtime', **env)
+            total = 0
+            for line in output.decode('utf-8').splitlines():
+                fields = line.split('|')
+                if len(fields) == 3 and fields[2].strip().split('.')[0] == 'moment':
+                    total += int(fields[0].split(':')[1])
+            timings.append(total)
+        self.assertTrue(min(timings) < self.MODULES_BUDGET_US, timings)
+
+
+class TimeZoneBackends(TestCase):
+
+    def tearDown(self):
+        moment.set_timezone_backend('pytz')
+
+    def test_pytz_is_the_default(self):
+        self.assertEquals(moment.get_timezone_backend(), 'pytz')
+        self.assertTrue(zones.get_zone('UTC') is pytz.utc)
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, moment.set_timezone_backend, 'dateutil')
+        self.assertEquals(moment.get_timezone_backend(), 'pytz')
+
+    @skipIf(zoneinfo is None, "zoneinfo is not installed")
+    def test_zoneinfo_backend_matches_pytz(self):
+        dates = [datetime(2012, 3, 11, 6, 59), datetime(2012, 3, 11, 7, 0),
+                 datetime(2012, 11, 4, 5, 59), datetime(2012, 11, 4, 6, 0)]
+        expected = [moment.utc(d).timezone('US/Eastern').date for d in dates]
+        moment.set_timezone_backend('zoneinfo')
+        self.assertEquals(moment.get_timezone_backend(), 'zoneinfo')
+        converted = [moment.utc(d).timezone('US/Eastern').date for d in dates]
+        self.assertEquals([d.replace(tzinfo=None) for d in converted],
+                          [d.replace(tzinfo=None) for d in expected])
+        self.assertEquals([d.utcoffset() for d in converted],
+                          [d.utcoffset() for d in expected])
+
+    @skipIf(zoneinfo is None, "zoneinfo is not installed")
+    def test_zoneinfo_backend_localizes(self):
+        moment.set_timezone_backend('zoneinfo')
+        d = moment.date(2012, 7, 1).locale('US/Eastern').date
+        self.assertEquals(d.utcoffset(), timedelta(hours=-4))
+        d = moment.date("2012-12-18T10:00:00+05:30").date
+        self.assertEquals(d.utcoffset(), timedelta(hours=5, minutes=30))
+
+
+@skipIf(numpy is None, "NumPy is not installed")
+class ColumnarInterop(TestCase):
+
+    def test_moments_to_datetime64(self):
+        values = interop.to_datetime64([moment.date(2012, 12, 18, 1, 2, 3, 456789),
+                                        moment.utc(2012, 12, 18),
+                                        moment.EpochMoment(2013, 1, 1)])
+        self.assertEquals(values.dtype, numpy.dtype('M8[us]'))
+        self.assertEquals(values.astype(object).tolist(),
+                          [datetime(2012, 12, 18, 1, 2, 3, 456789), datetime(2012, 12, 18),
+                           datetime(2013, 1, 1)])
+
+    def test_microsecond_columns_are_shared(self):
+        values = numpy.array(['2012-12-18T01:02:03'], dtype='M8[us]')
+        self.assertTrue(numpy.shares_memory(interop.to_datetime64(values), values))
+        self.assertTrue(numpy.shares_memory(interop.to_epochs(values), values))
+        epochs = numpy.array([1355792523000000])
+        self.assertTrue(numpy.shares_memory(interop.to_datetime64(epochs, 'us'), epochs))
+
+    def test_epochs(self):
+        values = interop.to_datetime64([1355788800, 0], unit='s')
+        self.assertEquals(interop.to_epochs(values, 'ms').tolist(), [1355788800000, 0])
+        self.assertRaises(ValueError, interop.to_datetime64, numpy.array([0]))
+
+    def test_to_moments(self):
+        values = numpy.array(['2012-07-01T12:00', 'NaT'], dtype='M8[us]')
+        moments = interop.to_moments(values, 'US/Eastern')
+        self.assertEquals(moments[0].hour, 8)
+        self.assertTrue(moments[1] is None)
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_round_trip(self):
+        values = numpy.array(['2012-12-18T01:02:03.456789', 'NaT', '2013-01-01'],
+                             dtype='M8[us]')
+        array = interop.to_arrow(values, tz='US/Eastern')
+        self.assertEquals(str(array.type), 'timestamp[us, tz=US/Eastern]')
+        self.assertEquals(array.null_count, 1)
+        back = interop.from_arrow(array)
+        self.assertEquals(back.astype(object).tolist(), values.astype(object).tolist())
+        self.assertEquals(interop.to_moments(array)[0].hour, 20)
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_buffers_are_shared(self):
+        values = numpy.array(['2012-12-18', '2013-01-01'], dtype='M8[us]')
+        array = interop.to_arrow(values)
+        self.assertTrue(numpy.shares_memory(interop.from_arrow(array), values))
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_units_and_slices(self):
+        array = pyarrow.array([0, 1355788800, None], type=pyarrow.timestamp('s'))
+        self.assertEquals(interop.to_epochs(array.slice(1), 's').tolist()[0], 1355788800)
+        self.assertRaises(TypeError, interop.from_arrow, pyarrow.array([1]))
+
+
+class CompiledParsing(TestCase):
+
+    def test_z_is_an_offset_token(self):
+        naive = moment.date(2012, 12, 18, 10)
+        self.assertEquals(naive.format("YYYY-MM-DDTHH:mm:ssZ"), "2012-12-18T10:00:00")
+        self.assertEquals(naive.format("YYYY-MM-DDTHH:mm:ss[Z]"), "2012-12-18T10:00:00Z")
+        self.assertEquals(moment.utc(2012, 12, 18, 10).format("YYYY-MM-DDTHH:mm:ssZ"),
+                          "2012-12-18T10:00:00+00:00")
+        aware = moment.date("2012-12-18T10:00:00Z", "YYYY-MM-DDTHH:mm:ssZ").date
+        self.assertEquals(aware.utcoffset(), timedelta(0))
+        literal = moment.date("2012-12-18T10:00:00Z", "YYYY-MM-DDTHH:mm:ss[Z]").date
+        self.assertEquals(literal, datetime(2012, 12, 18, 10))
+        self.assertEquals(literal.tzinfo, None)
+
+    def test_matches_strptime(self):
+        cases = [("December 18, 2012", "MMMM D, YYYY"),
+                 ("2012-12-18 10:05:03", "YYYY-MM-DD HH:mm:ss"),
+                 ("dec 18 12", "MMM DD YY"),
+                 ("20121218", "YYYYMMDD"),
+                 ("353 2012", "DDDD YYYY"),
+                 ("2012-12-18T10:05:03.250", "YYYY-MM-DDTHH:mm:ss.SSS"),
+                 ("Tuesday, December 18, 2012 01 PM", "dddd, MMMM DD, YYYY hh A"),
+                 ("2012-1-5", "YYYY-MM-DD")]
+        for string, pattern in cases:
+            plan = compile_format(pattern)
+            self.assertEquals(plan.parse(string), datetime.strptime(string, plan.strftime))
+
+    def test_tokens_strptime_cannot_parse(self):
+        self.assertEquals(moment.date("12/18/2012 1:05 pm", "M/D/YYYY h:mm a"),
+                          datetime(2012, 12, 18, 13, 5))
+        self.assertEquals(moment.date("7:30", "H:mm"), datetime(1900, 1, 1, 7, 30))
+        d = moment.date("2012-12-18T10:00:00+05:30", "YYYY-MM-DDTHH:mm:ssZ").date
+        self.assertEquals(d.utcoffset(), timedelta(hours=5, minutes=30))
+        d = moment.date("2012-12-18 10:00 -0500", "YYYY-MM-DD HH:mm ZZ").date
+        self.assertEquals(d.utcoffset(), timedelta(hours=-5))
+
+    def test_offsets_round_trip_through_format(self):
+        d = moment.date("2012-12-18T10:00:00-05:00")
+        self.assertEquals(d.format("YYYY-MM-DDTHH:mm:ssZ"), "2012-12-18T10:00:00-05:00")
+        self.assertEquals(d.format("ZZ"), "-0500")
+        self.assertEquals(moment.date(2012, 12, 18).format("HH:mm Z"), "00:00 ")
+
+    def test_mismatches_raise_value_error(self):
+        plan = compile_format("YYYY-MM-DD")
+        for string in ("2012-13-05", "2012-12-05x", " 2012-12-05", "+012-12-05", ""):
+            self.assertRaises(ValueError, plan.parse, string)
+
+
+class RelativeTime(TestCase):
+
+    def test_diff_without_a_unit_is_a_timedelta(self):
+        d = moment.date(2012, 12, 19)
+        self.assertEquals(d.diff(moment.date(2012, 12, 18)), timedelta(days=1))
+
+    def test_diff_in_fixed_units(self):
+        d = moment.date(2012, 12, 19, 12)
+        self.assertEquals(d.diff(datetime(2012, 12, 18), 'days'), 1)
+        self.assertEquals(d.diff(datetime(2012, 12, 18), 'hours'), 36)
+        self.assertEquals(d.diff(datetime(2012, 12, 18), 'd', precise=True), 1.5)
+        self.assertEquals(moment.date(2012, 12, 18).diff(d, 'days'), -1)
+        self.assertRaises(ValueError, d.diff, d, 'fortnights')
+
+    def test_diff_in_calendar_units(self):
+        d = moment.date(2012, 1, 31)
+        self.assertEquals(d.diff(moment.date(2012, 2, 29), 'months'), -1)
+        self.assertEquals(moment.date(2012, 3, 31).diff(d, 'months'), 2)
+        self.assertEquals(d.diff(moment.date(2012, 1, 1), 'months'), 0)
+        self.assertAlmostEqual(d.diff(moment.date(2012, 1, 1), 'months', True), 30 / 31.0)
+        self.assertEquals(moment.date(2013, 1, 31).diff(d, 'years'), 1)
+        self.assertEquals(moment.date(2012, 7, 31).diff(d, 'Q'), 2)
+
+    def test_diff_in_days_across_daylight_saving(self):
+        before = moment.date(2012, 3, 11).locale('US/Eastern')
+        after = moment.date(2012, 3, 12).locale('US/Eastern')
+        self.assertEquals(after.diff(before, 'days'), 1)
+        self.assertEquals(before.diff(after, 'days'), -1)
+        self.assertEquals(after.diff(before, 'days', precise=True), 1.0)
+        self.assertEquals(after.diff(before, 'hours'), 23)
+
+    def test_humanize_thresholds(self):
+        cases = [(0, 'a few seconds ago'), (44, 'in a few seconds'), (45, 'in a minute'),
+                 (90, 'in 2 minutes'), (2670, 'in an hour'), (5400, 'in 2 hours'),
+                 (77400, 'in a day'), (129600, 'in 2 days'), (26 * 86400, 'in a month'),
+                 (320 * 86400, 'in a year'), (-10 * 366 * 86400, '10 years ago')]
+        for seconds, phrase in cases:
+            self.assertEquals(humanize(seconds), phrase)
+        self.assertEquals(humanize(-10800, suffix=False), '3 hours')
+
+    def test_humanize_rounds_halves_up(self):
+        self.assertEquals(humanize(150), 'in 3 minutes')
+        self.assertEquals(humanize(-9000), '3 hours ago')
+        self.assertEquals(moment.date(2012, 1, 1, 0, 2, 30).to(moment.date(2012, 1, 1)),
+                          '3 minutes ago')
+
+    def test_from_now_and_to(self):
+        self.assertEquals(moment.now().subtract(hours=3).from_now(), '3 hours ago')
+        self.assertEquals(moment.utcnow().add(days=2, minutes=1).from_now(), 'in 2 days')
+        self.assertEquals(moment.date(2012, 1, 1).to(moment.date(2012, 1, 2)), 'in a day')
+
+    def test_humanize_many(self):
+        reference = datetime(2012, 12, 18)
+        dates = [datetime(2012, 12, 17, 23, 55), moment.date(2012, 12, 17, 23, 55),
+                 datetime(2013, 2, 18)]
+        self.assertEquals(moment.humanize_many(dates, reference),
+                          ['5 minutes ago', '5 minutes ago', 'in 2 months'])
+        self.assertEquals(moment.humanize_many([moment.now()]), ['a few seconds ago'])
+
+
+class BusinessDays(TestCase):
+
+    def test_weekdays_by_default(self):
+        self.assertTrue(moment.date(2024, 3, 15).is_business_day())
+        self.assertFalse(moment.date(2024, 3, 16).is_business_day())
+        self.assertEquals(moment.date(2024, 3, 15, 9).add_business_days(1).date,
+                          datetime(2024, 3, 18, 9))
+        self.assertEquals(moment.date(2024, 3, 18).add_business_days(-1).date,
+                          datetime(2024, 3, 15))
+        self.assertEquals(moment.date(2024, 3, 16).add_business_days(1).date,
+                          datetime(2024, 3, 18))
+        self.assertEquals(moment.date(2024, 3, 16).add_business_days(-1).date,
+                          datetime(2024, 3, 15))
+
+    def test_holidays_are_skipped(self):
+        calendar = moment.BusinessCalendar([datetime(2024, 12, 25), moment.date(2024, 12, 26)])
+        d = moment.date(2024, 12, 24).add_business_days(1, calendar)
+        self.assertEquals(d.date, datetime(2024, 12, 27))
+        self.assertFalse(moment.date(2024, 12, 25).is_business_day(calendar))
+        self.assertEquals(d.business_days_between(moment.date(2024, 12, 23), calendar), -2)
+
+    def test_counts_over_long_spans(self):
+        start, end = moment.date(2000, 1, 3), moment.date(2100, 1, 4)
+        self.assertEquals(start.business_days_between(end), 5218 * 5)
+        self.assertEquals(end.business_days_between(start), -(5218 * 5))
+        self.assertEquals(start.clone().add_business_days(5218 * 5).date, end.date)
+
+    def test_custom_weekend(self):
+        calendar = moment.BusinessCalendar(weekend=(4, 5))
+        self.assertTrue(moment.date(2024, 3, 17).is_business_day(calendar))
+        self.assertEquals(moment.date(2024, 3, 14).add_business_days(1, calendar).date,
+                          datetime(2024, 3, 17))
+
+    def test_holidays_from_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('# bank holidays\n2024-01-01 New Year\n\n2024-05-27\n')
+        try:
+            calendar = moment.BusinessCalendar.from_file(f.name)
+        finally:
+            os.remove(f.name)
+        self.assertFalse(calendar.is_business_day(datetime(2024, 1, 1)))
+        self.assertFalse(calendar.is_business_day(datetime(2024, 5, 27)))
+        self.assertTrue(calendar.is_business_day(datetime(2024, 5, 28)))
+
+    def test_frozen_moment_returns_a_copy(self):
+        d = moment.date(2024, 3, 15).freeze()
+        self.assertEquals(d.add_business_days(1).date, datetime(2024, 3, 18))
+        self.assertEquals(d.date, datetime(2024, 3, 15))
+
+
+class ThirtySecondsEast(tzinfo):
+
+    def utcoffset(self, date):
+        return timedelta(seconds=30)
+
+    def dst(self, date):
+        return timedelta(0)
+
+
+class NamelessSummerTime(tzinfo):
+
+    def utcoffset(self, date):
+        if date is None:
+            return None
+        return timedelta(hours=1 if 4 <= date.month <= 9 else 0)
+
+    def dst(self, date):
+        return timedelta(0)
+
+
+class CompactSerialization(TestCase):
+
+    def test_pickles_keep_zone_and_type(self):
+        values = [moment.utc(2012, 12, 18).timezone("US/Eastern"),
+                  moment.date("2012-12-18T10:00:00-05:30"), moment.Moment(),
+                  moment.EpochMoment.from_microseconds(10 ** 15, "Europe/Paris"),
+                  moment.FrozenMoment(2012, 12, 18)]
+        for d in values:
+            copy = pickle.loads(pickle.dumps(d, pickle.HIGHEST_PROTOCOL))
+            self.assertEquals(type(copy), type(d))
+            self.assertEquals(copy.date, d.date)
+            self.assertEquals(repr(copy), repr(d))
+        d = pickle.loads(pickle.dumps(values[0], pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(d.date.tzinfo.zone, "US/Eastern")
+
+    def test_pickles_keep_plain_dates(self):
+        d = moment.date(date(2012, 1, 1))
+        copy = pickle.loads(pickle.dumps(d, pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(copy.date, date(2012, 1, 1))
+        self.assertEquals(type(copy.date), date)
+
+    def test_pickles_keep_values_not_normalized_to_their_zone(self):
+        lmt = datetime(2012, 12, 18, 12, tzinfo=pytz.timezone('US/Eastern'))
+        d = moment.date(lmt)
+        copy = pickle.loads(pickle.dumps(d, pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(copy.date.replace(tzinfo=None), datetime(2012, 12, 18, 12))
+        self.assertEquals(copy.date.utcoffset(), lmt.utcoffset())
+
+    def test_pickles_are_smaller_than_datetimes(self):
+        d = moment.utc(2012, 12, 18).timezone("US/Eastern")
+        self.assertTrue(len(pickle.dumps(d, 2)) < len(pickle.dumps((d.date, "%Y-%m-%d"), 2)))
+
+    def test_encode_round_trip(self):
+        values = [moment.utc(2012, 12, 18).timezone("Asia/Kolkata"), None,
+                  datetime(1969, 12, 31, 23, 59, 59, 999999),
+                  moment.date("2012-12-18T10:00:00+02:00"), datetime(2012, 12, 18)]
+        decoded = moment.decode_many(moment.encode_many(values))
+        self.assertEquals(decoded[1], None)
+        for value, d in zip(values, decoded):
+            if value is not None:
+                if isinstance(value, moment.Moment):
+                    value = value.date
+                self.assertEquals(d.date, value)
+                self.assertEquals(d.date.utcoffset(), value.utcoffset())
+        self.assertEquals(moment.decode_many(moment.encode_many([])), [])
+
+    @skipIf(sys.version_info < (3, 7), "offsets with seconds need Python 3.7")
+    def test_offsets_with_seconds_are_kept_exactly(self):
+        d = moment.date(datetime(2012, 12, 18, 10, tzinfo=ThirtySecondsEast()))
+        copy = pickle.loads(pickle.dumps(d, pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(copy.date, d.date)
+        self.assertEquals(copy.date.utcoffset(), timedelta(seconds=30))
+        self.assertRaises(ValueError, moment.encode_many, [d])
+
+    def test_decoding_bad_input_raises_value_error(self):
+        data = moment.encode_many([moment.utc(2012, 12, 18).timezone("US/Eastern"), None])
+        for end in range(len(data)):
+            self.assertRaises(ValueError, moment.decode_many, data[:end])
+        self.assertRaises(ValueError, moment.decode_many, b"\x01\x05\x01")
+
+    def test_encoded_sequences_are_compact(self):
+        values = [moment.unix(1355788800 + minute * 60, utc=True) for minute in range(1000)]
+        data = moment.encode_many(values)
+        self.assertTrue(len(data) < 6 * len(values))
+        self.assertEquals([d.epoch() for d in moment.decode_many(data)],
+                          [d.epoch() for d in values])
+
+
+class ParallelBatches(TestCase):
+
+    def setUp(self):
+        self.min_items = parallel.MIN_ITEMS
+        parallel.MIN_ITEMS = 10
+        self.strings = ["2012-12-%02d %02d:30" % (day, hour)
+                        for day in range(1, 29) for hour in range(24)]
+
+    def tearDown(self):
+        parallel.MIN_ITEMS = self.min_items
+
+    def test_parse_keeps_order(self):
+        expected = list(moment.parse_many(self.strings, "YYYY-MM-DD HH:mm", tz="US/Eastern"))
+        result = list(moment.parse_many(self.strings, "YYYY-MM-DD HH:mm", tz="US/Eastern",
+                                        workers=2))
+        self.assertEquals(result, expected)
+        self.assertEquals([d.tzinfo.zone for d in result[:2]], ["US/Eastern"] * 2)
+        epochs = list(moment.parse_many(self.strings, "YYYY-MM-DD HH:mm", unit="s", workers=2))
+        self.assertEquals(epochs, [to_epoch(d) for d in
+                                   moment.parse_many(self.strings, "YYYY-MM-DD HH:mm")])
+
+    def test_parse_errors_keep_their_index(self):
+        strings = list(self.strings)
+        strings[500] = "not a date"
+        errors = []
+        result = list(moment.parse_many(strings, "YYYY-MM-DD HH:mm", errors=errors, workers=3))
+        self.assertEquals(result[500], None)
+        self.assertEquals([(index, string) for index, string, _ in errors],
+                          [(500, "not a date")])
+        self.assertRaises(ValueError, list,
+                          moment.parse_many(strings, "YYYY-MM-DD HH:mm", workers=3))
+
+    def test_format_keeps_order(self):
+        dates = list(moment.parse_many(self.strings, "YYYY-MM-DD HH:mm"))
+        result = list(moment.format_many(dates, "YYYY-MM-DD HH:mm", workers=2))
+        self.assertEquals(result, self.strings)
+        epochs = [to_epoch(d) for d in dates]
+        result = list(moment.format_many(epochs, "YYYY-MM-DD HH:mm", tz="UTC", workers=2))
+        self.assertEquals(result, self.strings)
+
+    def test_workers_match_in_process_output(self):
+        eastern = pytz.timezone("US/Eastern")
+        values = [datetime(2012, 1, 1, 12, tzinfo=eastern), moment.utc(2012, 12, 18),
+                  datetime(2012, 7, 1, 12, tzinfo=NamelessSummerTime()),
+                  eastern.localize(datetime(2012, 7, 1, 12)), datetime(2012, 12, 18, 1), None]
+        dates = [datetime(2012, 12, 18).date(), datetime(2013, 1, 1).date()]
+        for values, pattern, tz in [(values, "YYYY-MM-DD HH:mm Z", None),
+                                    (values[1:], "YYYY-MM-DD HH:mm Z", "Asia/Kolkata"),
+                                    (dates, "YYYY-MM-DD dddd", None),
+                                    ([1355788800, 1355788800000], "YYYY-MM-DD HH:mm", None)]:
+            values = values * 10
+            self.assertEquals(list(moment.format_many(values, pattern, tz, workers=2)),
+                              list(moment.format_many(values, pattern, tz)))
+
+    def test_packed_chunks_rebuild_exactly(self):
+        eastern = pytz.timezone("US/Eastern")
+        values = [datetime(2012, 1, 1, 12, tzinfo=eastern), None,
+                  eastern.localize(datetime(2012, 7, 1, 12, 0, 0, 5)),
+                  datetime(1969, 12, 31, 23, 59, 59, 999999)]
+        packed = pickle.loads(pickle.dumps(parallel._pack(values), pickle.HIGHEST_PROTOCOL))
+        self.assertTrue(isinstance(packed, tuple))
+        rebuilt = list(parallel._unpack(packed))
+        self.assertEquals(rebuilt, values)
+        self.assertEquals([d and d.utcoffset() for d in rebuilt],
+                          [d and d.utcoffset() for d in values])
+        dates = [datetime(2012, 12, 18).date()]
+        self.assertTrue(parallel._pack(dates) is dates)
+        self.assertEquals(list(parallel._unpack(parallel._pack_epochs([1, -2]))), [1, -2])
+        epochs = [1, None]
+        self.assertTrue(parallel._pack_epochs(epochs) is epochs)
+
+    def test_small_batches_stay_in_process(self):
+        parallel.MIN_ITEMS = self.min_items
+        result = moment.format_many([datetime(2012, 12, 18)], "YYYY-MM-DD", workers=4)
+        self.assertEquals(list(result), ["2012-12-18"])
+
+
+class BatchFormatting(TestCase):
+
+    def test_matches_single_formatting(self):
+        dates = [datetime(2012, 12, 18, hour, minute) for hour in range(0, 24, 5)
+                 for minute in (0, 59)] + [datetime(2012, 12, 19, 1), datetime(2013, 1, 1, 13)]
+        for pattern in ["YYYY-MM-DD HH:mm:ss", "HH:mm [on] dddd, MMMM D YYYY",
+                        "h:mm A", "D/M/YY [at] HH[%]", "YYYY"]:
+            expected = [moment.date(d).format(pattern) for d in dates]
+            self.assertEquals(list(moment.format_many(dates, pattern)), expected)
+
+    def test_accepts_moments_datetimes_and_epochs(self):
+        values = [moment.utc(2012, 12, 18), datetime(2012, 12, 18), 1355788800,
+                  1355788800000, None]
+        self.assertEquals(list(moment.format_many(values, "YYYY-MM-DD HH:mm")),
+                          ["2012-12-18 00:00"] * 4 + [""])
+        self.assertEquals(list(moment.format_many(values[:4], "YYYY-MM-DD HH:mm Z",
+                                                  tz="US/Eastern")),
+                          ["2012-12-17 19:00 -05:00"] * 4)
+
+    def test_writes_lines_to_a_stream(self):
+        stream = BytesIO() if sys.version_info[0] == 2 else StringIO()
+        dates = [datetime(2012, 12, 18, hour) for hour in range(3)]
+        self.assertEquals(moment.format_many(dates, "HH:mm", stream=stream), 3)
+        self.assertEquals(stream.getvalue(), "00:00\n01:00\n02:00\n")
+
+
+class Formatting(TestCase):
+
+    def test_format_renders_milliseconds(self):
+        d = moment.date(2012, 12, 18, 13, 4, 5, 123456)
+        self.assertEquals(d.format('HH:mm:ss.SSS'), '13:04:05.123')
+
+    def test_format_renders_twelve_hour_clock(self):
+        d = moment.date(2012, 12, 18, 0, 4)
+        self.assertEquals(d.format('h:mm a'), '12:04 am')
+        d = moment.date(2012, 12, 18, 13, 4)
+        self.assertEquals(d.format('hh:mm A'), '01:04 PM')
+        self.assertEquals(d.format('H:m'), '13:4')
+
+    def test_format_renders_names(self):
+        d = moment.date(2012, 12, 18)
+        self.assertEquals(d.format('dddd, MMMM D, YYYY'), 'Tuesday, December 18, 2012')
+        self.assertEquals(d.format('ddd MMM DDDD'), 'Tue Dec 353')
+
+    def test_format_matches_strftime(self):
+        d = moment.date(2012, 3, 4, 5, 6, 7)
+        pattern = 'YYYY-MM-DD HH:mm:ss YY DDDD'
+        self.assertEquals(d.format(pattern), d.strftime(parse_js_date(pattern)))
+
+    def test_format_with_literals_only(self):
+        d = moment.date(2012, 12, 18)
+        self.assertEquals(d.format('[100%]'), '100%')
+
+
+class FormatTokens(TestCase):
+
+    def test_tokens_are_translated_to_strftime(self):
+        self.assertEquals(parse_js_date('YYYY-MM-DD HH:mm:ss'), '%Y-%m-%d %H:%M:%S')
+        self.assertEquals(parse_js_date('MMMM D, YYYY'), '%B %d, %Y')
+
+    def test_bracketed_text_is_literal(self):
+        self.assertEquals(parse_js_date('[Month] M [at] h'), 'Month %m at %l')
+        self.assertEquals(parse_js_date('[100%] YYYY'), '100%% %Y')
+
+    def test_literal_text_is_not_clobbered(self):
+        plan = compile_format('YYYY-MM-DDTHH')
+        self.assertEquals(plan.strftime, '%Y-%m-%dT%H')
+        self.assertEquals(plan.tokens[-2], (LITERAL, 'T'))
+
+    def test_compiled_plans_are_cached(self):
+        clear_format_cache()
+        first = compile_format('YYYY-MM-DD')
+        second = compile_format('YYYY-MM-DD')
+        self.assertTrue(first is second)
+        info = format_cache_info()
+        self.assertEquals(info['hits'], 1)
+        self.assertEquals(info['misses'], 1)
+
+    def test_format_cache_is_bounded(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+        self.assertEquals(len(cache), 2)
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=3)
+        for key in 'abcd':
+            cache.put(key, key)
+        cache.get('b')
+        cache.put('c', 'C')
+        cache.put('e', 'e')
+        self.assertEquals(sorted(key for key in 'abcde' if key in cache), ['b', 'c', 'e'])
+        self.assertEquals(cache.get('c'), 'C')
+        cache.clear()
+        self.assertEquals((len(cache), cache.get('b')), (0, None))
+
+
 if __name__ == '__main__':
     main()